@@ -4,6 +4,7 @@ import pygwalker as pyg
 from pygwalker.api.streamlit  import StreamlitRenderer, init_streamlit_comm
 import matplotlib.pyplot as plt
 import altair as alt
+from srr_parsing import format_hms
 
 
 # Adjust the width of the Streamlit page
@@ -94,15 +95,6 @@ def perform_eda(dataframe):
         st.write("No columns with duplicates found.")
 
     # Add the new code to create the SME summary table
-    def seconds_to_hms(seconds):
-        if pd.notnull(seconds):
-            hours = int(seconds) // 3600
-            minutes = (int(seconds) % 3600) // 60
-            seconds = int(seconds) % 60
-            return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
-        else:
-            return "N/A"
-
     df_grouped = dataframe.groupby('SME (On It)').agg(
         Avg_On_It_Sec=pd.NamedAgg(column='TimeTo: On It Sec', aggfunc='mean'),
         Avg_Attended_Sec=pd.NamedAgg(column='TimeTo: Attended Sec', aggfunc='mean'),
@@ -110,8 +102,8 @@ def perform_eda(dataframe):
     ).reset_index()
     df_grouped['Total_Avg_Sec'] = df_grouped['Avg_On_It_Sec'] + df_grouped['Avg_Attended_Sec']
     df_sorted = df_grouped.sort_values(by=['Total_Avg_Sec', 'Number_of_Interactions'], ascending=[True, False])
-    df_sorted['Avg_On_It'] = df_sorted['Avg_On_It_Sec'].apply(seconds_to_hms)
-    df_sorted['Avg_Attended'] = df_sorted['Avg_Attended_Sec'].apply(seconds_to_hms)
+    df_sorted['Avg_On_It'] = format_hms(df_sorted['Avg_On_It_Sec'])
+    df_sorted['Avg_Attended'] = format_hms(df_sorted['Avg_Attended_Sec'])
     df_sorted.rename(columns={'SME (On It)': 'SME'}, inplace=True)
 
     st.subheader("SME Handle Time Table")
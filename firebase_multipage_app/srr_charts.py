@@ -0,0 +1,180 @@
+import hashlib
+import threading
+from collections import Counter
+
+import altair as alt
+import pandas as pd
+import plotly.express as px
+
+from srr_views import ViewCache
+
+MONTH_ORDER = ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August', 'September', 'October',
+               'November', 'December']
+RESPONSE_COLUMNS = ['TimeTo_On_It_Minutes', 'TimeTo_Attended_Minutes']
+
+# Upper bound for the serialized spec of any dashboard chart. The charts only
+# embed one row per category (month, service, SME, case reason), so their size
+# does not grow with the number of cases; see the ``charts`` benchmark.
+CHART_SPEC_BUDGET = 64 * 1024
+CHART_CACHE_SIZE = 256  # serialized charts kept server-wide, one per (chart, data, options)
+
+
+def response_times_long(agg, by):
+    """``by`` / Category / Minutes rows of an agg_month or agg_service table, for stacked bars."""
+    return agg.melt(id_vars=[by], value_vars=RESPONSE_COLUMNS, var_name='Category', value_name='Minutes')
+
+
+def monthly_response_chart(agg_month):
+    """'Monthly Response Times': stacked On It / Attended minutes per month, in calendar order."""
+    return alt.Chart(response_times_long(agg_month, 'Month')).mark_bar().encode(
+        x=alt.X('Month', sort=MONTH_ORDER),  # Use the 'sort' argument to order months
+        y=alt.Y('Minutes', stack='zero'),  # Use stack='zero' for stacking
+        color='Category',  # Color distinguishes the categories
+        tooltip=['Month', 'Category', 'Minutes']  # Optional: add tooltip for interactivity
+    ).properties(
+        title='Monthly Response Times',
+        width=600,
+        height=400
+    )
+
+
+def service_response_chart(agg_service):
+    """'Group Response Times': stacked On It / Attended minutes per service."""
+    return alt.Chart(response_times_long(agg_service, 'Service')).mark_bar().encode(
+        x='Service',
+        y=alt.Y('Minutes', stack='zero'),
+        color='Category',
+        tooltip=['Service', 'Category', 'Minutes']
+    ).properties(
+        title='Group Response Times',
+        width=600,
+        height=400
+    )
+
+
+def interaction_count_chart(service_counts, height=400):
+    """'Interaction Count': interactions per service."""
+    return alt.Chart(service_counts[['Service', 'Interactions']]).mark_bar().encode(
+        x='Service',
+        y=alt.Y('Interactions:Q', title='Count of Records'),
+        tooltip=['Service', 'Interactions']
+    ).properties(
+        title='Interaction Count',
+        width=600,
+        height=height
+    )
+
+
+def interactions_handled_chart(sme_counts):
+    """'Interactions Handled': interactions per SME, busiest first."""
+    return alt.Chart(sme_counts[['SME (On It)', 'Interactions']]).mark_bar().encode(
+        y=alt.Y('SME (On It):N', sort='-x'),  # Sorting based on the count in descending order
+        x=alt.X('Interactions:Q', title='Unique Case Count'),
+        tooltip=['SME (On It)', 'Interactions']
+    ).properties(
+        title='Interactions Handled',
+        width=600,
+        height=600
+    )
+
+
+def case_reason_pie(case_counts):
+    """'Distribution of Case Reasons' pie (counts are in the 'Service' column)."""
+    return px.pie(case_counts[['Case Reason', 'Service']], values='Service', names='Case Reason',
+                  title='Distribution of Case Reasons')
+
+
+def sme_minutes_chart(sme_summary, column, title, axis_title, highlight_above=None):
+    """Bars of one per-SME minutes column of the SME summary, largest first.
+
+    Bars above ``highlight_above`` minutes are drawn in red.
+    """
+    encoding = {}
+    if highlight_above is not None:
+        encoding['color'] = alt.condition(alt.datum[column] > highlight_above, alt.value('red'), alt.value('steelblue'))
+    return alt.Chart(sme_summary[['SME', column]]).mark_bar().encode(
+        x=alt.X('SME', title='SME', sort='-y'),
+        y=alt.Y(f'{column}:Q', title=axis_title),
+        tooltip=['SME', alt.Tooltip(f'{column}:Q', title=axis_title)],
+        **encoding
+    ).properties(
+        width=600,
+        height=400,
+        title=title
+    )
+
+
+def spec_size(chart):
+    """Size in bytes of a chart as sent to the browser (Vega-Lite or Plotly JSON)."""
+    return len(chart.to_json().encode())
+
+
+def fingerprint(frame):
+    """Digest of a frame's columns, dtypes and values (index included)."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr([(str(column), str(dtype)) for column, dtype in frame.dtypes.items()]).encode())
+    digest.update(pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+class ChartCache:
+    """Serialized charts shared by every session, keyed by chart, data fingerprint and options.
+
+    Altair charts are kept as their Vega-Lite spec dict (for st.vega_lite_chart),
+    so a hit skips building and validating the chart; Plotly figures are kept
+    as built. Lookups and builds are counted per chart.
+    """
+
+    def __init__(self, maxsize=CHART_CACHE_SIZE):
+        self._specs = ViewCache(maxsize)
+        self._lookups = Counter()
+        self._builds = Counter()
+        self._lock = threading.Lock()
+
+    def get(self, build, data, **options):
+        """The serialized ``build(data, **options)``, built only if that data and options are new."""
+        name = build.__name__
+        key = (name, fingerprint(data)) + tuple(sorted(options.items()))
+        built = []
+
+        def serialize():
+            built.append(name)
+            chart = build(data, **options)
+            if isinstance(chart, alt.TopLevelMixin):
+                spec = chart.to_dict()
+                spec.pop('config', None)  # theme defaults, which Streamlit leaves out as well
+                return spec
+            return chart
+
+        spec = self._specs.get(key, serialize)
+        with self._lock:
+            self._lookups[name] += 1
+            self._builds[name] += len(built)
+        return spec
+
+    def clear(self):
+        self._specs.clear()
+
+    def stats(self):
+        """{chart: hits, misses and hit rate}."""
+        with self._lock:
+            return {name: {'hits': lookups - self._builds[name], 'misses': self._builds[name],
+                           'hit_rate': (lookups - self._builds[name]) / lookups}
+                    for name, lookups in sorted(self._lookups.items())}
+
+
+_charts = ChartCache()
+
+
+def cached_chart(build, data, **options):
+    """``build(data, **options)`` from the server-wide chart cache.
+
+    Altair builders give a Vega-Lite spec, to render with st.vega_lite_chart;
+    Plotly builders give the Figure, for st.plotly_chart.
+    """
+    return _charts.get(build, data, **options)
+
+
+def chart_cache_stats():
+    """Per-chart hit/miss counters of the server-wide chart cache."""
+    return _charts.stats()
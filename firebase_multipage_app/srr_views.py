@@ -0,0 +1,286 @@
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from srr_cube import ratio, snapshot_cube
+from srr_index import FILTER_COLUMNS, filter_index
+from srr_parsing import format_hms
+from srr_pivot import SparsePivot, pivot_codes
+from srr_sketch import QUANTILES
+
+VIEW_CACHE_SIZE = 64  # distinct (page, snapshot, sidebar selection) views kept server-wide
+
+QUEUE_COLUMNS = ['Case #', 'Requestor', 'Service', 'Creation Timestamp', 'Message Link']
+PROGRESS_COLUMNS = ['Case #', 'Requestor', 'Service', 'Creation Timestamp', 'SME (On It)', 'TimeTo: On It', 'Message Link']
+LIVE_STATUSES = ['In Queue', 'In Progress']  # the cases shown by the live queue panels
+
+
+class ViewCache:
+    """Size-bounded LRU shared by every session of the server.
+
+    A key is built at most once: sessions asking for a key that is being
+    built wait for it instead of building it again.
+    """
+
+    def __init__(self, maxsize=VIEW_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._building = {}  # key -> lock held while that key is built
+        self._lock = threading.Lock()
+
+    def _lookup(self, key):
+        # Call with self._lock held
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, self._entries[key]
+        return False, None
+
+    def get(self, key, factory):
+        """Return the cached value for ``key``, calling ``factory()`` on a miss."""
+        with self._lock:
+            found, value = self._lookup(key)
+            if found:
+                return value
+            building = self._building.setdefault(key, threading.Lock())
+        with building:
+            with self._lock:
+                found, value = self._lookup(key)  # built by another session while this one waited
+                if found:
+                    return value
+                self.misses += 1
+            try:
+                value = factory()
+            except BaseException:
+                with self._lock:
+                    self._building.pop(key, None)
+                raise
+            with self._lock:
+                # Stored before the build lock goes, so a session arriving in between finds the entry
+                self._entries[key] = value
+                self._building.pop(key, None)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Hit/miss counters and current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+            }
+
+
+def response_times(totals, by):
+    """Mean TimeTo: seconds per ``by``, formatted and in minutes, as the charts expect.
+
+    ``totals`` is the cube rollup by ``by``.
+    """
+    on_it = (totals['on_it_sum'] / totals['n']).to_numpy()
+    attended = (totals['attended_sum'] / totals['n']).to_numpy()
+    return pd.DataFrame({
+        by: totals[by],
+        'TimeTo: On It Sec': on_it,
+        'TimeTo: Attended Sec': attended,
+        'TimeTo: On It': format_hms(on_it),
+        'TimeTo: Attended': format_hms(attended),
+        'TimeTo_On_It_Minutes': on_it / 60,
+        'TimeTo_Attended_Minutes': attended / 60,
+    })
+
+
+def interaction_counts(totals, by):
+    """Number of interactions per ``by``, for the Interaction Count charts."""
+    return totals[[by]].assign(Interactions=totals['n'])
+
+
+def sme_summary(totals, percentiles, survey=True):
+    """Per-SME averages and percentiles, fastest first, then by number of interactions (and survey).
+
+    ``totals`` is the cube rollup by SME and ``percentiles`` maps each sketch
+    name to the frame of its per-SME quantiles.
+    """
+    on_it = (totals['on_it_sum'] / totals['n']).to_numpy()
+    attended = (totals['attended_sum'] / totals['n']).to_numpy()
+    columns = {
+        'SME (On It)': totals['SME (On It)'],
+        'Avg_On_It_Sec': on_it,
+        'Avg_Attended_Sec': attended,
+        'Number_of_Interactions': totals['n'],
+    }
+    sort_by, ascending = ['Total_Avg_Sec', 'Number_of_Interactions'], [True, False]
+    if survey:
+        columns['Avg_Survey'] = ratio(totals['survey_sum'], totals['survey_n'])
+        sort_by, ascending = sort_by + ['Avg_Survey'], ascending + [False]
+
+    columns['Total_Avg_Sec'] = on_it + attended
+    columns['Avg_On_It'] = format_hms(on_it)
+    columns['Avg_Attended'] = format_hms(attended)
+    columns['Avg_On_It_Min'] = on_it / 60
+    columns['Avg_Attended_Min'] = attended / 60
+    for name, prefix in (('on_it', 'On_It'), ('attended', 'Attended')):
+        by_sme = percentiles[name].reindex(totals['SME (On It)'])
+        for label in QUANTILES:
+            seconds = by_sme[label].to_numpy()
+            columns[f'{prefix}_{label.upper()}_Sec'] = seconds  # e.g. On_It_P90_Sec
+            columns[f'{prefix}_{label.upper()}'] = format_hms(seconds)
+    summary = pd.DataFrame(columns).sort_values(by=sort_by, ascending=ascending)
+    return summary.rename(columns={'SME (On It)': 'SME'})
+
+
+def case_reason_counts(totals):
+    """Interactions per 'Case Reason' (in a 'Service' column, as the pie chart expects), smallest first.
+
+    ``totals`` is the cube rollup by 'Case Reason' of the cases with a Service.
+    """
+    counts = totals[['Case Reason']].assign(Service=totals['n'])
+    return counts.sort_values(by='Service', ascending=True)
+
+
+def dashboard_rollups(cube, mask):
+    """Every cube rollup the dashboards render, in one pass over the selected cells."""
+    return cube.rollups({
+        'totals': None,
+        'cases': (None, 'Service'),  # 'Interactions' counts the cases with a Service
+        'Month': 'Month',
+        'Service': 'Service',
+        'SME (On It)': 'SME (On It)',
+        'Case Reason': ('Case Reason', 'Service'),
+    }, mask)
+
+
+def cube_filters(service, month, weekend, working_hours, sme):
+    """The cube selection equivalent to a (normalized) sidebar selection."""
+    if sme is not None:
+        return {'SME (On It)': list(sme)}  # a SME selection filters across the whole sheet, like the pages
+    filters = {}
+    if service != 'All':
+        filters['Service'] = service
+    if month != 'All':
+        filters['Month'] = month
+    if weekend != 'All':
+        filters['Weekend?'] = weekend == 'Yes'
+    if working_hours != 'All':
+        filters['Working Hours?'] = working_hours == 'Yes'
+    return filters
+
+
+class DashboardView:
+    """One sidebar selection of the Agent / Management pages, fully computed.
+
+    The tiles, charts and summary tables come from a single dashboard_rollups
+    pass over the cube cells in ``mask``, the Requestor pivot (a SparsePivot,
+    paged by the grid) from one count over the pre-factorized keys of the
+    selected rows. The filtered data is kept as the selected row
+    ``positions`` (None for all), which the 'Show Data' RowTable pages
+    through on demand; the In Queue / In Progress tables are LiveQueues.
+    Views are shared between sessions: treat all of it as read-only.
+    """
+
+    def __init__(self, index, rows, frame, cube, mask, codes):
+        survey = 'Survey' in frame
+        self.positions = None if rows is None else index.positions(rows)
+
+        rollups = dashboard_rollups(cube, mask)
+        totals = rollups['totals']
+        self.totals = totals  # the cube measures (n, on_it_sum, on_it_n...) of the whole selection
+        self.case_count = rollups['cases']['n']
+        self.avg_on_it_sec = ratio(totals['on_it_sum'], totals['on_it_n'])
+        self.avg_attended_sec = ratio(totals['attended_sum'], totals['attended_n'])
+        self.survey_avg = ratio(totals['survey_sum'], totals['survey_n']) if survey else None
+        self.survey_count = totals['survey_n'] if survey else None
+        self.on_it_percentiles = cube.quantiles('on_it', mask=mask)  # {'p50': seconds, 'p90': ..., 'p99': ...}
+        self.attended_percentiles = cube.quantiles('attended', mask=mask)
+
+        self.agg_month = response_times(rollups['Month'], 'Month')
+        self.agg_service = response_times(rollups['Service'], 'Service')
+        self.service_counts = interaction_counts(rollups['Service'], 'Service')
+        self.sme_counts = interaction_counts(rollups['SME (On It)'], 'SME (On It)')
+        self.case_counts = case_reason_counts(rollups['Case Reason'])
+        self.requestor_pivot = SparsePivot(codes, self.positions)
+        self.sme_summary = sme_summary(rollups['SME (On It)'],
+                                       {name: cube.quantiles(name, 'SME (On It)', mask) for name in cube.sketches},
+                                       survey)
+
+
+_views = ViewCache()
+
+
+def selection_key(service, month, weekend, working_hours, sme):
+    """Normalized sidebar selection; every way of saying "all SMEs" maps to None."""
+    sme = None if not sme or 'All' in sme else tuple(sorted(sme))
+    return service, month, weekend, working_hours, sme
+
+
+def get_view(snapshot, page, selection, rows, frame):
+    """DashboardView of ``page`` for one sidebar ``selection`` of ``snapshot``.
+
+    ``rows`` is the selection as a FilterIndex bitmap and ``frame`` the page's
+    projection of the snapshot. The view is only built on a cache miss, so
+    identical selections cost one computation per snapshot, whichever
+    session asks first.
+    """
+    selection = selection_key(*selection)
+    key = (page, snapshot.digest, snapshot.version) + selection
+
+    def build():
+        cube = snapshot_cube(snapshot)
+        return DashboardView(filter_index(snapshot), rows, frame, cube, cube.select(cube_filters(*selection)),
+                             pivot_codes(snapshot))
+
+    return _views.get(key, build)
+
+
+def status_projection(snapshot):
+    """Open cases (LIVE_STATUSES) of a snapshot, with only the queue panel and filter columns; built once."""
+    def build():
+        frame = snapshot.frame
+        columns = [column for column in dict.fromkeys(QUEUE_COLUMNS + PROGRESS_COLUMNS + FILTER_COLUMNS)
+                   if column in frame]
+        return frame.loc[frame['Status'].isin(LIVE_STATUSES).to_numpy(), columns]
+
+    return snapshot.derive('status_projection', build)
+
+
+class LiveQueues:
+    """The In Queue and In Progress tables of one sidebar selection.
+
+    Built from a status_projection, so refreshing them for every new
+    snapshot only touches the open cases, not the whole sheet.
+    """
+
+    def __init__(self, frame, filters):
+        """``filters`` is a cube_filters selection, applied to the projection ``frame``."""
+        for column, value in filters.items():
+            frame = frame[frame[column].isin(value) if isinstance(value, list) else frame[column] == value]
+        self.in_queue = frame[frame['Status'] == 'In Queue'][QUEUE_COLUMNS]
+        in_progress = frame[frame['Status'] == 'In Progress'][PROGRESS_COLUMNS]
+        self.in_progress = in_progress.assign(**{
+            'TimeTo: On It': format_hms(in_progress['TimeTo: On It'].dt.total_seconds(), na_rep=None)})
+
+
+_queues = ViewCache()
+
+
+def get_live_queues(snapshot, selection):
+    """LiveQueues of one sidebar ``selection`` of ``snapshot``, shared by the sessions showing it."""
+    selection = selection_key(*selection)
+    key = (snapshot.digest, snapshot.version) + selection
+    return _queues.get(key, lambda: LiveQueues(status_projection(snapshot), cube_filters(*selection)))
+
+
+def view_cache_stats():
+    """Hit/miss counters of the server-wide view cache."""
+    return _views.stats()
@@ -1,15 +1,23 @@
 import streamlit as st
 import pandas as pd
-import time
 import numpy as np
 import altair as alt
 from streamlit_lottie import st_lottie
-import requests
 import json
 from st_aggrid import AgGrid, GridOptionsBuilder, GridUpdateMode
 from st_aggrid.shared import JsCode
 import plotly.express as px
 from session_state import get  # Import the session state module
+from srr_parsing import seconds_to_hms
+from srr_index import filter_index
+from srr_pivot import PAGE_SIZE, TOTAL
+from srr_charts import (cached_chart, case_reason_pie, interaction_count_chart, interactions_handled_chart,
+                        monthly_response_chart, service_response_chart)
+from srr_assets import image_asset, lottie_asset
+from srr_table import RowTable, show_table, table_index
+from srr_views import get_live_queues, get_view
+from srr_live import live_panels, show_changes
+from srr_source import get_analytics_snapshot, refresh_snapshot
 
 session_state = get()
 
@@ -20,56 +28,24 @@ else:
 
     st.set_page_config(page_title="SRR Agent View", page_icon=":mag_right:", layout="wide")
 
-    # Create functions for computation
-    @st.cache_data(ttl=120, show_spinner=True)
-    def load_data(url):
-        df = pd.read_csv(url)
-        df['Date Created'] = pd.to_datetime(df['Date Created'], errors='coerce')  # set 'Date Created' as datetime
-        df.rename(columns={'In process (On It SME)': 'SME (On It)'}, inplace=True)  # Renaming column
-        df.drop('Survey', axis=1, inplace=True)
-        return df
-
-    def calculate_metrics(df):
-        unique_case_count = df['Service'].count()
-        return unique_case_count
-
-    def convert_to_seconds(time_str):
-        if pd.isnull(time_str):
-            return 0
-        try:
-            h, m, s = map(int, time_str.split(':'))
-            return h * 3600 + m * 60 + s
-        except ValueError:
-            return 0
-
-    def seconds_to_hms(seconds):
-        hours = seconds // 3600
-        minutes = (seconds % 3600) // 60
-        seconds = seconds % 60
-        return f"{int(hours):02d}:{int(minutes):02d}:{int(seconds):02d}"
-
     url = 'https://docs.google.com/spreadsheets/d/e/2PACX-1vSQVnfH-edbXqAXxlCb2FrhxxpsOHJhtqKMYsHWxf5SyLVpAPTSIWQeIGrBAGa16dE4CA59o2wyz59G/pub?gid=0&single=true&output=csv'
-    df = load_data(url).copy()
-
-    # Function to load a lottie animation from a URL
-    def load_lottieurl(url: str):
-        r = requests.get(url)
-        if r.status_code != 200:
-            return None
-        return r.json()
+    analytics = get_analytics_snapshot(url)  # charts and tables, moving on every ANALYTICS_INTERVAL seconds
+    df = analytics.project(drop=['Survey'])  # shared, read-only projection
+    index = filter_index(analytics)  # per-snapshot bitmaps behind the sidebar filters
 
-    lottie_globe = load_lottieurl("https://lottie.host/1df5f62e-c32f-47e8-aece-793c034b27e9/sQMtFYb9Rm.json")
-    lottie_clap = load_lottieurl("https://lottie.host/af0a6ccc-a8ac-4921-8564-5769d8e09d1e/4Czx1gna6U.json")
-    lottie_queuing = load_lottieurl("https://lottie.host/910429d2-a0a4-4668-a4d4-ee831f9ccecd/yOKbdL2Yze.json")
-    lottie_inprogress = load_lottieurl("https://lottie.host/c5c6caea-922b-4b4e-b34a-41ecaafe2a13/mphMkSfOkR.json")
-    lottie_chill = load_lottieurl("https://lottie.host/2acdde4d-32d7-44a8-aa64-03e1aa191466/8EG5a8ToOQ.json")
+    # Animations come from the shared asset store (memory, local disk, fallback copies): reruns never download
+    lottie_globe = lottie_asset('globe')
+    lottie_clap = lottie_asset('clap')
+    lottie_queuing = lottie_asset('queuing')
+    lottie_inprogress = lottie_asset('inprogress')
+    lottie_chill = lottie_asset('chill')
 
     # Button to refresh the data - align to upper right
     col1, col2 = st.columns([3, .350])
     with col2:
         if st.button('Refresh Data'):
             # st.experimental_memo.clear()
-            st.cache_data.clear()
+            refresh_snapshot(url)  # coalesced, rate-limited refresh of the shared snapshot only
             # st.experimental_rerun()
             st.rerun()
 
@@ -90,9 +66,9 @@ else:
             st.rerun()
 
     # Insert Five9 logo
-    five9logo_url = "https://raw.githubusercontent.com/mackensey31712/srr/main/five9log1.png"
+    five9logo = image_asset('five9_logo')
 
-    st.sidebar.image(five9logo_url, width=200)
+    st.sidebar.image(five9logo, width=200)
 
 
     # Sidebar Title
@@ -100,23 +76,20 @@ else:
 
     # Sidebar with a dropdown for 'Service' column filtering
     with st.sidebar:
-        selected_service = st.selectbox('Service', ['All'] + list(df['Service'].unique()))
+        selected_service = st.selectbox('Service', ['All'] + index.options('Service'))
 
-    # Apply filtering
+    # Apply filtering (rows is a bitmap over the snapshot, None meaning every row)
+    rows = None
     if selected_service != 'All':
-        df_filtered = df[df['Service'] == selected_service]
-    else:
-        df_filtered = df
+        rows = index.match('Service', selected_service)
 
     # Sidebar with a dropdown for 'Month' column filtering
     with st.sidebar:
-        selected_month = st.selectbox('Month', ['All'] + list(df_filtered['Month'].unique()))
+        selected_month = st.selectbox('Month', ['All'] + index.options('Month', rows))
 
     # Apply filtering
     if selected_month != 'All':
-        df_filtered = df_filtered[df_filtered['Month'] == selected_month]
-    else:
-        df_filtered = df_filtered
+        rows = index.match('Month', selected_month, rows)
 
     # Sidebar with a dropdown for 'Weekend?' column filtering
     with st.sidebar:
@@ -124,9 +97,7 @@ else:
 
     # Apply filtering
     if selected_weekend != 'All':
-        df_filtered = df_filtered[df_filtered['Weekend?'] == selected_weekend]
-    else:
-        df_filtered = df_filtered
+        rows = index.match('Weekend?', selected_weekend == 'Yes', rows)
 
     # Sidebar with a dropdown for 'Working Hours?' column filtering
     with st.sidebar:
@@ -134,13 +105,11 @@ else:
 
     # Apply filtering
     if selected_working_hours != 'All':
-        df_filtered = df_filtered[df_filtered['Working Hours?'] == selected_working_hours]
-    else:
-        df_filtered = df_filtered
+        rows = index.match('Working Hours?', selected_working_hours == 'Yes', rows)
 
     # Sidebar with a multi-select dropdown for 'SME (On It)' column filtering
     with st.sidebar:
-        all_sme_options = ['All'] + list(df_filtered['SME (On It)'].unique())
+        all_sme_options = ['All'] + index.options('SME (On It)', rows)
         selected_sme_on_it = st.multiselect('SME (On It)', all_sme_options, default='All')
 
     # # Apply filtering
@@ -157,25 +126,26 @@ else:
         
     else:
         # If specific SMEs are selected, filter the dataframe and display the result
-        df_filtered = df[df['SME (On It)'].isin(selected_sme_on_it)]
+        rows = index.match_any('SME (On It)', selected_sme_on_it)  # across the whole sheet, as before
         st.sidebar.markdown(
             "<h3 style='color: red;'>Displaying Selected SMEs</h1>",
             unsafe_allow_html=True)
-        df_filtered = df_filtered
 
+    # The filtered frame and everything derived from it (mostly rollups of the snapshot's cube),
+    # computed once per snapshot and selection for all sessions
+    selection = (selected_service, selected_month, selected_weekend, selected_working_hours, selected_sme_on_it)
+    # The session keeps its last selection and view: reruns that keep both (paging, expanders) reuse the view
+    # even once the shared view cache dropped it
+    last_selection, view = session_state.cache.get(('view', 'agent'), (None, None))
+    if last_selection != (analytics.version, selection):
+        view = get_view(analytics, 'agent', selection, rows, df)
+        session_state.cache.put(('view', 'agent'), ((analytics.version, selection), view))
+    data_table = RowTable(table_index(analytics), df, view.positions)  # served a page at a time
 
 
-    # DataFrames for "In Queue" and "In Progress"
-    df_inqueue = df_filtered[df_filtered['Status'] == 'In Queue']
-    df_inqueue = df_inqueue[['Case #', 'Requestor','Service','Creation Timestamp', 'Message Link']]
-    df_inprogress = df_filtered[df_filtered['Status'] == 'In Progress']
-    df_inprogress = df_inprogress[['Case #', 'Requestor','Service','Creation Timestamp', 'SME (On It)', 'TimeTo: On It', 'Message Link']]
-
     # DataFrame was originaly placed here
 
     # Metrics
-    df_filtered['TimeTo: On It Sec'] = df_filtered['TimeTo: On It'].apply(convert_to_seconds)
-    df_filtered['TimeTo: Attended Sec'] = df_filtered['TimeTo: Attended'].apply(convert_to_seconds)
     # overall_avg_on_it = df_filtered['TimeTo: On It Sec'].mean()
     # overall_avg_attended = df_filtered['TimeTo: Attended Sec'].mean()
     # unique_case_count = calculate_metrics(df_filtered)
@@ -190,17 +160,15 @@ else:
     #     st.metric("Overall Avg. TimeTo: Attended", seconds_to_hms(overall_avg_attended))
 
     #-------------------------
-    # Ensure 'TimeTo: On It' and 'TimeTo: Attended' are in timedelta format -----------------------------
-    df_filtered['TimeTo: On It'] = pd.to_timedelta(df_filtered['TimeTo: On It'])
-    df_filtered['TimeTo: Attended'] = pd.to_timedelta(df_filtered['TimeTo: Attended'])
+    # 'TimeTo: On It' and 'TimeTo: Attended' are already timedeltas (parsed in load_data)
 
     # Calculate the average seconds directly from 'TimeTo: On It' and 'TimeTo: Attended', and convert to 'hh:mm:ss'
-    overall_avg_on_it_sec = df_filtered['TimeTo: On It'].dt.total_seconds().mean()
-    overall_avg_attended_sec = df_filtered['TimeTo: Attended'].dt.total_seconds().mean()
+    overall_avg_on_it_sec = view.avg_on_it_sec
+    overall_avg_attended_sec = view.avg_attended_sec
 
     overall_avg_on_it_hms = seconds_to_hms(overall_avg_on_it_sec)
     overall_avg_attended_hms = seconds_to_hms(overall_avg_attended_sec)
-    unique_case_count = calculate_metrics(df_filtered)
+    unique_case_count = view.case_count
 
     # Display metrics
     col1, col3,col5 = st.columns(3)
@@ -211,186 +179,112 @@ else:
     with col5:
         st.metric("Overall Avg. TimeTo: Attended", overall_avg_attended_hms)
 
+    # Percentiles are not skewed by a few stuck cases like the averages are
+    percentile_cols = st.columns(6)
+    percentile_tiles = [(f"{label.upper()} TimeTo: {name}", seconds)
+                        for name, values in [('On It', view.on_it_percentiles), ('Attended', view.attended_percentiles)]
+                        for label, seconds in values.items()]
+    for col, (label, seconds) in zip(percentile_cols, percentile_tiles):
+        with col:
+            st.metric(label, seconds_to_hms(seconds))
+
     #------------------------
 
-    # Display "In Queue" DataFrame with count
-    in_queue_count = len(df_inqueue)
-
-    # Using columns to place text and animation side by side
-    if in_queue_count == 0:
-        col1, col2 = st.columns([0.3, 1.2])  # Adjust the ratio as needed for your layout
-        with col1:
-            st.title(f'In Queue (0)')
-        with col2:
-            # Display Lottie animation if count is 0
-            st_lottie(lottie_clap, speed=1, height=100, width=200)  # Adjust height as needed
-        with st.expander("Show Data", expanded=False):
-            st.dataframe(df_inqueue, use_container_width=True)
-    else:
-        col1, col2 = st.columns([0.3, 1.2])  # Adjust the ratio as needed for your layout
-        with col1:
-            st.title(f'In Queue ({in_queue_count})')
-        with col2:
-            # Display Lottie animation if count is not 0
-            st_lottie(lottie_queuing, speed=1, height=100, width=200)  # Adjust height as needed
-        with st.expander("Show Data", expanded=False):
-            st.dataframe(df_inqueue, use_container_width=True)
-
-
-    # Display "In Progress" DataFrame with count
-    in_progress_count = len(df_inprogress)
-    if in_progress_count == 0:
-        col1, col2 = st.columns([0.4, 1.2])  # Adjust the ratio as needed for your layout
-        with col1:
-            st.title(f'In Progress (0)')
-        with col2:
-            # Display Lottie animation if count is 0
-            st_lottie(lottie_chill, speed=1, height=100, width=200)  # Adjust height as needed
-        with st.expander("Show Data", expanded=False):
-            st.dataframe(df_inprogress, use_container_width=True)
-    else:
-        col1, col2 = st.columns([0.4, 1.2])  # Adjust the ratio as needed for your layout
-        with col1:
-            st.title(f'In Progress ({in_progress_count})')
-        with col2:
-            # Display Lottie animation if count is not 0
-            st_lottie(lottie_inprogress, speed=1, height=100, width=200)  # Adjust height as needed
-        with st.expander("Show Data", expanded=False):
-            st.dataframe(df_inprogress, use_container_width=True)
+    # The live panels rerun on their own whenever the latest snapshot changes (see live_panels);
+    # they are built from the open cases of that snapshot, filtered like the rest of the page
+    def live_queue_panels(snapshot):
+        queues = get_live_queues(snapshot, selection)
+        df_inqueue = queues.in_queue
+        df_inprogress = queues.in_progress
+
+        # New cases, status transitions and reassignments since the previous snapshot
+        show_changes(snapshot, key='agent_changes')
+
+        # Display "In Queue" DataFrame with count
+        in_queue_count = len(df_inqueue)
+
+        # Using columns to place text and animation side by side
+        if in_queue_count == 0:
+            col1, col2 = st.columns([0.3, 1.2])  # Adjust the ratio as needed for your layout
+            with col1:
+                st.title(f'In Queue (0)')
+            with col2:
+                # Display Lottie animation if count is 0
+                st_lottie(lottie_clap, speed=1, height=100, width=200)  # Adjust height as needed
+            # Only sent to the browser while the expander is open
+            in_queue_data = st.expander("Show Data", expanded=False, key='agent_in_queue_data', on_change='rerun')
+            with in_queue_data:
+                if in_queue_data.open:
+                    st.dataframe(df_inqueue, use_container_width=True)
+        else:
+            col1, col2 = st.columns([0.3, 1.2])  # Adjust the ratio as needed for your layout
+            with col1:
+                st.title(f'In Queue ({in_queue_count})')
+            with col2:
+                # Display Lottie animation if count is not 0
+                st_lottie(lottie_queuing, speed=1, height=100, width=200)  # Adjust height as needed
+            # Only sent to the browser while the expander is open
+            in_queue_data = st.expander("Show Data", expanded=False, key='agent_in_queue_data', on_change='rerun')
+            with in_queue_data:
+                if in_queue_data.open:
+                    st.dataframe(df_inqueue, use_container_width=True)
+
+
+        # Display "In Progress" DataFrame with count
+        in_progress_count = len(df_inprogress)
+        if in_progress_count == 0:
+            col1, col2 = st.columns([0.4, 1.2])  # Adjust the ratio as needed for your layout
+            with col1:
+                st.title(f'In Progress (0)')
+            with col2:
+                # Display Lottie animation if count is 0
+                st_lottie(lottie_chill, speed=1, height=100, width=200)  # Adjust height as needed
+            # Only sent to the browser while the expander is open
+            in_progress_data = st.expander("Show Data", expanded=False, key='agent_in_progress_data', on_change='rerun')
+            with in_progress_data:
+                if in_progress_data.open:
+                    st.dataframe(df_inprogress, use_container_width=True)
+        else:
+            col1, col2 = st.columns([0.4, 1.2])  # Adjust the ratio as needed for your layout
+            with col1:
+                st.title(f'In Progress ({in_progress_count})')
+            with col2:
+                # Display Lottie animation if count is not 0
+                st_lottie(lottie_inprogress, speed=1, height=100, width=200)  # Adjust height as needed
+            # Only sent to the browser while the expander is open
+            in_progress_data = st.expander("Show Data", expanded=False, key='agent_in_progress_data', on_change='rerun')
+            with in_progress_data:
+                if in_progress_data.open:
+                    st.dataframe(df_inprogress, use_container_width=True)
+
+    live_panels(url, analytics, live_queue_panels)
 
     # Display the filtered dataframe
     st.title('Data')
-    with st.expander('Show Data', expanded=False):
-        st.dataframe(df_filtered)
-
-
-    agg_month = df_filtered.groupby('Month').agg({
-        'TimeTo: On It Sec': 'mean',
-        'TimeTo: Attended Sec': 'mean'
-    }).reset_index()
-
-    agg_month['TimeTo: On It'] = agg_month['TimeTo: On It Sec'].apply(seconds_to_hms)
-    agg_month['TimeTo: Attended'] = agg_month['TimeTo: Attended Sec'].apply(seconds_to_hms)
+    show_table(data_table, key='agent_data')  # nothing is rendered until the expander is opened
 
-    agg_service = df_filtered.groupby('Service').agg({
-        'TimeTo: On It Sec': 'mean',
-        'TimeTo: Attended Sec': 'mean'
-    }).reset_index()
 
-    agg_service['TimeTo: On It'] = agg_service['TimeTo: On It Sec'].apply(seconds_to_hms)
-    agg_service['TimeTo: Attended'] = agg_service['TimeTo: Attended Sec'].apply(seconds_to_hms)
+    # Mean response times per month / service, with 'hh:mm:ss' and minute columns
+    agg_month = view.agg_month
+    agg_service = view.agg_service
 
     # st.set_option('deprecation.showPyplotGlobalUse', False)
 
-    # Instead of converting these columns to datetime, converting seconds to minutes or hours for a more interpretable visualization
-    agg_month['TimeTo: On It Minutes'] = agg_month['TimeTo: On It Sec'] / 60
-    agg_month['TimeTo: Attended Minutes'] = agg_month['TimeTo: Attended Sec'] / 60
-
-
     col1,col5 = st.columns(2)
 
-    # Create an interactive bar chart using Altair
-
-    # Adjust the column names to remove spaces and special characters
-    agg_month.rename(columns={
-        'TimeTo: On It Minutes': 'TimeTo_On_It_Minutes',
-        'TimeTo: Attended Minutes': 'TimeTo_Attended_Minutes'
-    }, inplace=True)
-
-    agg_month_long = agg_month.melt(id_vars=['Month'],
-                                    value_vars=['TimeTo_On_It_Minutes', 'TimeTo_Attended_Minutes'],
-                                    var_name='Category',
-                                    value_name='Minutes')
-
-    month_order = ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August', 'September', 'October', 'November', 'December']
-
-    # Create a stacked bar chart with months ordered as specified
-    chart = alt.Chart(agg_month_long).mark_bar().encode(
-        x=alt.X('Month', sort=month_order),  # Use the 'sort' argument to order months
-        y=alt.Y('Minutes', stack='zero'),  # Use stack='zero' for stacking
-        color='Category',  # Color distinguishes the categories
-        tooltip=['Month', 'Category', 'Minutes']  # Optional: add tooltip for interactivity
-    ).properties(
-        title='Monthly Response Times',
-        width=600,
-        height=400
-    )
-
-    # To display the chart in your Streamlit app
+    # Every chart embeds one row per month / service / SME / case reason, never the cases themselves,
+    # and is only rebuilt when that data changed (cached_chart is shared by all sessions)
     with col1:
-        st.write(chart)
-
-    # Convert seconds to minutes directly for 'agg_service'
-    agg_service['TimeTo_On_It_Minutes'] = agg_service['TimeTo: On It Sec'] / 60
-    agg_service['TimeTo_Attended_Minutes'] = agg_service['TimeTo: Attended Sec'] / 60
-
-    # Now, the DataFrame 'agg_service' contains correctly named columns for melting
-    agg_service_long = agg_service.melt(id_vars=['Service'],
-                                        value_vars=['TimeTo_On_It_Minutes', 'TimeTo_Attended_Minutes'],
-                                        var_name='Category',
-                                        value_name='Minutes')
-
-    # Create a stacked bar chart
-    chart2 = alt.Chart(agg_service_long).mark_bar().encode(
-        x='Service',
-        y=alt.Y('Minutes', stack='zero'),  # Use stack='zero' for stacking
-        color='Category',  # Color distinguishes the categories
-        tooltip=['Service', 'Category', 'Minutes']  # Optional: add tooltip for interactivity
-    ).properties(
-        title='Group Response Times',
-        width=600,
-        height=400
-    )
-
-    # To display the chart in your Streamlit app
+        st.vega_lite_chart(cached_chart(monthly_response_chart, agg_month))
     with col5:
-        st.write(chart2)
-
-    # Create an interactive bar chart  to show the 'unique case count' for each service
-    chart3 = alt.Chart(df_filtered).mark_bar().encode(
-        x='Service',
-        y='count()',
-        tooltip=['Service', 'count()']
-    ).properties(
-        title='Interaction Count',
-        width=600,
-        height=400
-    )
-
-    # To display the chart in your Streamlit app
+        st.vega_lite_chart(cached_chart(service_response_chart, agg_service))
     with col1:
-        st.write(chart3)
-
-    # Create an interactive bar chart using Altair to show the 'unique case count' for each 'SME (On It)'
-    chart4 = alt.Chart(df_filtered).mark_bar().encode(
-        y=alt.Y('SME (On It):N', sort='-x'),  # Sorting based on the count in descending order, ensure to specify ':N' for nominal data
-        x=alt.X('count()', title='Unique Case Count'),
-        tooltip=['SME (On It)', 'count()']
-    ).properties(
-        title='Interactions Handled',
-        width=600,
-        height=600
-    )
-
-    # To display the chart in your Streamlit app
+        st.vega_lite_chart(cached_chart(interaction_count_chart, view.service_counts, height=400))
     with col5:
-        st.write(chart4)
-
-
-    # Filter out rows where "Case Reason" or "Case #" is null (adjust column names as necessary)
-    # df_filtered = df.dropna(subset=['Case #', 'Case Reason'])
-
-    # Group by "Case Reason" and count "Case #" occurrences
-    case_counts = df_filtered.groupby('Case Reason')['Service'].count().reset_index()
+        st.vega_lite_chart(cached_chart(interactions_handled_chart, view.sme_counts))
 
-    # Sort the DataFrame by counts in ascending order
-    case_counts_sorted = case_counts.sort_values(by='Service', ascending=True)
-
-    # Generate a pie chart
-    fig = px.pie(case_counts_sorted, values='Service', names='Case Reason', title='Distribution of Case Reasons')
-
-    # Show the pie chart in the Streamlit app
-    st.plotly_chart(fig)
+    # "Case #" occurrences per "Case Reason", sorted by counts in ascending order
+    st.plotly_chart(cached_chart(case_reason_pie, view.case_counts))
 
 
     st.subheader('Interaction Count by Requestor')
@@ -398,15 +292,20 @@ else:
 
     # Display a Dataframe where the rows are the 'Requestor', the columns would be the 'Service', and the values would be the count of each 'Service'
 
-    # Create a pivot table using pandas
-    pivot_df = df_filtered.pivot_table(index='Requestor', columns='Service', aggfunc='size', fill_value=0)
+    # Sparse counts built once per filtered view; only the requested page is sent to the grid
+    pivot = view.requestor_pivot
+    col1, col2 = st.columns(2)
+    with col1:
+        sort_by = st.selectbox('Sort Requestors by', ['Requestor', TOTAL] + list(pivot.columns))
+    with col2:
+        page_number = st.number_input('Page', min_value=1, max_value=max(pivot.page_count(), 1), value=1,
+                                      help=f'{len(pivot)} requestors, {PAGE_SIZE} per page')
 
-    # Reset the index so 'Requestor' becomes a regular column
-    pivot_df.reset_index(inplace=True)
+    # Pivot table with 'Requestor' as a regular column
+    pivot_df = pivot.page(page_number - 1, PAGE_SIZE, None if sort_by == 'Requestor' else sort_by)
 
     # Setting up GridOptions for AgGrid
     gb = GridOptionsBuilder.from_dataframe(pivot_df)
-    gb.configure_pagination(paginationAutoPageSize=False, paginationPageSize=10)  # Enable pagination
     # gb.configure_side_bar(filters_panel=False, columns_panel=False)  # Enable side bar if you want filters and columns tool panel
     gb.configure_default_column(groupable=True, value=True, enableRowGroup=True, aggFunc='sum', editable=False)
 
@@ -420,28 +319,9 @@ else:
     # and then by the highest average survey.
 
     # Group by 'SME (On It)' and calculate the required metrics including average survey
-    # df_filtered['TimeTo: On It Sec'] = df_filtered['TimeTo: On It'].apply(convert_to_seconds)
-    # df_filtered['TimeTo: Attended Sec'] = df_filtered['TimeTo: Attended'].apply(convert_to_seconds)
 
-    df_grouped = df_filtered.groupby('SME (On It)').agg(
-        Avg_On_It_Sec=pd.NamedAgg(column='TimeTo: On It Sec', aggfunc='mean'),
-        Avg_Attended_Sec=pd.NamedAgg(column='TimeTo: Attended Sec', aggfunc='mean'),
-        Number_of_Interactions=pd.NamedAgg(column='SME (On It)', aggfunc='count')
-    ).reset_index()
-
-    df_grouped['Total_Avg_Sec'] = df_grouped['Avg_On_It_Sec'] + df_grouped['Avg_Attended_Sec']
-    df_sorted = df_grouped.sort_values(by=['Total_Avg_Sec', 'Number_of_Interactions'], ascending=[True, False])
-    df_sorted['Avg_On_It'] = df_sorted['Avg_On_It_Sec'].apply(seconds_to_hms)
-    df_sorted['Avg_Attended'] = df_sorted['Avg_Attended_Sec'].apply(seconds_to_hms)
-
-    # Rename 'SME (On It)' column to 'SME'
-    df_sorted.rename(columns={'SME (On It)': 'SME'}, inplace=True)
+    df_sorted = view.sme_summary
 
     st.subheader("SME Summary Table")
-    st.dataframe(df_sorted[['SME', 'Avg_On_It', 'Avg_Attended', 'Number_of_Interactions']].set_index('SME'))
-
-
-    # Auto-update every 5 minutes
-    refresh_rate = 120  # 300 seconds = 5 minutes
-    time.sleep(refresh_rate)
-    st.rerun()
+    st.dataframe(df_sorted[['SME', 'Avg_On_It', 'On_It_P50', 'On_It_P90', 'On_It_P99', 'Avg_Attended', 'Attended_P50',
+                             'Attended_P90', 'Attended_P99', 'Number_of_Interactions']].set_index('SME'))
@@ -2,6 +2,8 @@ import streamlit as st
 import pandas as pd
 from pygwalker.api.streamlit import StreamlitRenderer, init_streamlit_comm
 from session_state import get  # Import the session state module
+from srr_parsing import prepare_raw_sheet
+from srr_source import get_snapshot
 
 st.set_page_config(page_title="srr anlaytics tool", layout="wide")
 
@@ -31,18 +33,16 @@ else:
 
 
     # Function to load data
-    @st.cache_data(ttl=120, show_spinner=True)
     def load_data(url):
-        df = pd.read_csv(url)
-        df['Date Created'] = pd.to_datetime(df['Date Created'], errors='coerce')  # set 'Date Created' as datetime
-        df.rename(columns={'In process (On It SME)': 'SME (On It)'}, inplace=True)  # Renaming column
-        return df
+        # The dashboards' shared snapshot, re-read once with every column untouched
+        snapshot = get_snapshot(url)
+        return snapshot.derive('raw', lambda: prepare_raw_sheet(snapshot.read_csv()))
 
     url = 'https://docs.google.com/spreadsheets/d/e/2PACX-1vSQVnfH-edbXqAXxlCb2FrhxxpsOHJhtqKMYsHWxf5SyLVpAPTSIWQeIGrBAGa16dE4CA59o2wyz59G/pub?gid=0&single=true&output=csv'
-    dataframe = load_data(url).copy()
+    dataframe = load_data(url)
 
-    # Display PygWalker interface
-    renderer = StreamlitRenderer(dataframe, spec="./gw_config.json", spec_io_mode="rw")
+    # Display PygWalker interface, on a copy: the renderer may modify the frame it is given
+    renderer = StreamlitRenderer(dataframe.copy(), spec="./gw_config.json", spec_io_mode="rw")
     renderer.render_explore()
 
     # Function to perform EDA
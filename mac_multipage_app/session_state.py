@@ -1,14 +1,237 @@
-import streamlit as st
+"""State of each browser session (authentication, per-session caches), kept apart per session.
 
-class _sessionstate:
-    def __init__(self):
+Every Streamlit session gets its own SessionState from a process-wide
+SessionStore, keyed by session id. A session's state is dropped once the
+Streamlit server reports the session closed, or when more than MAX_SESSIONS
+sessions are open (least recently run first). An idle session (a wallboard
+tab on an unchanged sheet does not rerun for hours) stays logged in, but its
+cache is cleared after SESSION_IDLE_TIMEOUT seconds without a run. Each
+session's cache is capped at SESSION_CACHE_BYTES.
+"""
+import heapq
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from streamlit import runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+logger = logging.getLogger(__name__)
+
+SESSION_CACHE_BYTES = 32 * 1024 * 1024  # cache budget of one session
+SWEEP_INTERVAL = 60  # seconds between two sweeps for closed and idle sessions
+SESSION_IDLE_TIMEOUT = 30 * 60  # seconds without a run after which a session's cache is cleared
+MAX_SESSIONS = 1000  # sessions kept at most; beyond, the least recently run ones are dropped
+BARE_SESSION = 'bare'  # session id of a script run without a Streamlit session (bare mode)
+
+
+def sizeof(value, seen=None):
+    """Approximate bytes held by ``value`` and everything it references, frames and arrays included.
+
+    Objects reachable twice are counted once; objects shared with other
+    sessions or caches are counted in full.
+    """
+    seen = set() if seen is None else seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return sys.getsizeof(value) if value.base is None else value.nbytes
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(sizeof(key, seen) + sizeof(item, seen) for key, item in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(sizeof(item, seen) for item in value)
+    elif hasattr(value, '__dict__'):
+        size += sizeof(vars(value), seen)
+    return size
+
+
+class SessionCache:
+    """Values one session keeps between reruns (last selection, last view...), least recently used first out.
+
+    Entries are sized when stored; older ones are dropped while the cache is
+    over ``max_bytes``. The newest entry is always kept.
+    """
+
+    def __init__(self, max_bytes=SESSION_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (value, bytes)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._entries:
+                return default
+            self._entries.move_to_end(key)
+            return self._entries[key][0]
+
+    def put(self, key, value):
+        with self._lock:
+            stored = self._entries.pop(key, None)
+        # Storing the same object again (the same view on every rerun) does not size it again
+        size = stored[1] if stored is not None and stored[0] is value else sizeof(value)
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = value, size
+            while len(self._entries) > 1 and self._nbytes() > self.max_bytes:
+                self._entries.popitem(last=False)
+
+    def _nbytes(self):
+        # Call with self._lock held
+        return sum(size for _, size in self._entries.values())
+
+    @property
+    def nbytes(self):
+        """Bytes of the cached values, as sized when they were stored."""
+        with self._lock:
+            return self._nbytes()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SessionState:
+    """State of one session: the attributes the pages set, and its ``cache``."""
+
+    def __init__(self, cache_bytes=SESSION_CACHE_BYTES):
         self.user_authenticated = False
+        self.cache = SessionCache(cache_bytes)
+
+
+_warnings = []  # logged once per process
+
+
+def _session_closed(session_id):
+    # Whether the Streamlit server forgot the session (its tab was closed and did not reconnect)
+    if session_id == BARE_SESSION or not runtime.exists():
+        return False
+    try:
+        return runtime.get_instance()._session_mgr.get_session_info(session_id) is None
+    except AttributeError:  # the server internals moved: keep every session rather than log users out
+        if not _warnings:
+            _warnings.append(session_id)
+            logger.warning('Cannot tell closed sessions from open ones, session state is never released')
+        return False
+
+
+class SessionStore:
+    """SessionState of every session of the process, by session id.
+
+    Every ``sweep_interval`` seconds, the sessions the server reports
+    closed are dropped and their cache cleared, so nothing a session cached
+    outlives it, and the caches of sessions idle for ``idle_timeout`` seconds
+    are cleared. At most ``max_sessions`` sessions are kept: a new session
+    drops the least recently run ones, which log in again on their next run.
+    """
+
+    def __init__(self, cache_bytes=SESSION_CACHE_BYTES, sweep_interval=SWEEP_INTERVAL,
+                 idle_timeout=SESSION_IDLE_TIMEOUT, max_sessions=MAX_SESSIONS, is_closed=_session_closed):
+        self.cache_bytes = cache_bytes
+        self.sweep_interval = sweep_interval
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.is_closed = is_closed
+        self.released = 0  # sessions dropped so far
+        self._sessions = {}  # session id -> [SessionState, last run]
+        self._swept_at = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def state(self, session_id, now=None):
+        """SessionState of ``session_id``, created on its first run."""
+        now = time.time() if now is None else now
+        if self._swept_at is None or now - self._swept_at >= self.sweep_interval:
+            self.sweep(now)
+        dropped = []
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                entry = self._sessions[session_id] = [SessionState(self.cache_bytes), now]
+                if len(self._sessions) > self.max_sessions:
+                    others = [other for other in self._sessions if other != session_id]
+                    dropped = heapq.nsmallest(len(self._sessions) - self.max_sessions, others,
+                                              key=lambda other: self._sessions[other][1])
+            else:
+                entry[1] = now
+        for other in dropped:
+            self.release(other)
+        return entry[0]
+
+    def release(self, session_id):
+        """Drop the state of ``session_id``, if it is kept."""
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+            self.released += entry is not None
+        if entry is not None:
+            entry[0].cache.clear()
+
+    def sweep(self, now=None):
+        """Drop the sessions the server reports closed and clear the caches of idle ones; returns the closed ids."""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._swept_at = now
+            entries = list(self._sessions.items())
+        closed = [session_id for session_id, _ in entries if self.is_closed(session_id)]
+        for session_id in closed:
+            self.release(session_id)
+        for session_id, (state, last_run) in entries:
+            if session_id not in closed and now - last_run >= self.idle_timeout:
+                state.cache.clear()
+        return closed
+
+    def usage(self, now=None):
+        """Memory accounting per session: {session id: bytes of its state and cache, cache entries, idle seconds}."""
+        now = time.time() if now is None else now
+        with self._lock:
+            entries = list(self._sessions.items())
+        usage = {}
+        for session_id, (state, last_run) in entries:
+            attributes = {name: value for name, value in vars(state).items() if value is not state.cache}
+            usage[session_id] = {
+                'state_bytes': sizeof(attributes),
+                'cache_bytes': state.cache.nbytes,
+                'cache_entries': len(state.cache),
+                'idle_seconds': round(now - last_run, 1),
+            }
+        return usage
+
+
+_store = SessionStore()
+
+
+def current_session_id():
+    """Id of the Streamlit session running the script (BARE_SESSION outside of one)."""
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return BARE_SESSION if ctx is None else ctx.session_id
+
 
 def get(**kwargs):
-    """Gets a sessionstate object for the current session."""
-    if not hasattr(st, '_session_state'):
-        st._session_state = _sessionstate()
+    """Gets the sessionstate object of the current session, setting the ``kwargs`` it does not have yet."""
+    session_state = _store.state(current_session_id())
     for key, value in kwargs.items():
-        if not hasattr(st._session_state, key):
-            setattr(st._session_state, key, value)
-    return st._session_state
\ No newline at end of file
+        if not hasattr(session_state, key):
+            setattr(session_state, key, value)
+    return session_state
+
+
+def memory_usage():
+    """SessionStore.usage of the process: bytes held by every session's state and cache."""
+    return _store.usage()
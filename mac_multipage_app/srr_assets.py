@@ -0,0 +1,194 @@
+"""Lottie animations and images of the pages, served without per-rerun downloads.
+
+Assets are downloaded once per server into a disk cache. The ``assets``
+directory shipped with the app holds fallback copies, shown only while the
+download of an asset keeps failing (no network); run ``python srr_assets.py``
+on a connected machine to replace them with the upstream files.
+"""
+import base64
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+ASSETS = {
+    'globe': 'https://lottie.host/1df5f62e-c32f-47e8-aece-793c034b27e9/sQMtFYb9Rm.json',
+    'people': 'https://lottie.host/2ad92c27-a3c0-47cc-8882-9eb531ee1e0c/A9tbMxONxp.json',
+    'clap': 'https://lottie.host/af0a6ccc-a8ac-4921-8564-5769d8e09d1e/4Czx1gna6U.json',
+    'queuing': 'https://lottie.host/910429d2-a0a4-4668-a4d4-ee831f9ccecd/yOKbdL2Yze.json',
+    'inprogress': 'https://lottie.host/c5c6caea-922b-4b4e-b34a-41ecaafe2a13/mphMkSfOkR.json',
+    'chill': 'https://lottie.host/2acdde4d-32d7-44a8-aa64-03e1aa191466/8EG5a8ToOQ.json',
+    'five9_logo': 'https://raw.githubusercontent.com/mackensey31712/srr/main/five9log1.png',
+}
+FALLBACK_DIR = Path(__file__).with_name('assets')  # copies shipped with the app, for failed downloads
+CACHE_DIR = Path(os.environ.get('SRR_ASSET_CACHE', Path(tempfile.gettempdir()) / 'srr_assets'))
+DOWNLOAD_TIMEOUT = 10  # seconds
+RETRY_INTERVAL = 60  # seconds before retrying a failed download, doubled after every failure
+MAX_RETRY_INTERVAL = 3600
+# Shown while an asset is being downloaded (st_lottie rejects None, and URLs would be fetched)
+EMPTY_LOTTIE = {'v': '5.7.4', 'fr': 30, 'ip': 0, 'op': 1, 'w': 1, 'h': 1, 'layers': []}
+EMPTY_IMAGE = base64.b64decode('iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNkYAAAAAYAAjCB0C8AAAAASUVORK5CYII=')
+IMAGE_SIGNATURES = {'.png': b'\x89PNG\r\n\x1a\n', '.jpg': b'\xff\xd8\xff', '.gif': b'GIF8'}
+
+
+def asset_filename(name, assets=ASSETS):
+    """File name of asset ``name`` in the cache and fallback directories."""
+    return name + Path(urlparse(assets[name]).path).suffix
+
+
+def is_valid(filename, content):
+    """Whether ``content`` is a plausible ``filename``: parseable JSON, or an image with the right signature."""
+    suffix = Path(filename).suffix
+    if suffix == '.json':
+        try:
+            json.loads(content)
+        except ValueError:
+            return False
+        return True
+    return content.startswith(IMAGE_SIGNATURES.get(suffix, b''))
+
+
+def _read(path):
+    try:
+        return path.read_bytes()
+    except OSError:
+        return None
+
+
+def _write(path, content):
+    # Write then rename, so that concurrent readers never see a partial file
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_name(f'.{path.name}.{os.getpid()}.{threading.get_ident()}')
+    partial.write_bytes(content)
+    os.replace(partial, path)
+
+
+class AssetStore:
+    """Assets read from memory or local disk, never downloaded by a page.
+
+    An asset is served from memory, else from the disk cache, so neither the
+    server nor the browser makes a request for it on a rerun. An asset that
+    is not cached yet is shown empty and downloaded in the background into
+    the disk cache. Once its download has failed, the fallback copy shipped
+    with the app is shown instead, and the download is retried after
+    RETRY_INTERVAL seconds, doubling up to MAX_RETRY_INTERVAL; the first
+    successful download replaces the fallback.
+    """
+
+    def __init__(self, assets=ASSETS, cache_dir=CACHE_DIR, fallback_dir=FALLBACK_DIR, timeout=DOWNLOAD_TIMEOUT,
+                 retry_interval=RETRY_INTERVAL, max_retry_interval=MAX_RETRY_INTERVAL):
+        self.assets = assets
+        self.cache_dir = Path(cache_dir)
+        self.fallback_dir = Path(fallback_dir)
+        self.timeout = timeout
+        self.retry_interval = retry_interval
+        self.max_retry_interval = max_retry_interval
+        self.downloads = 0  # requests made, successful or not
+        self._memory = {}  # name -> bytes
+        self._fallbacks = {}  # name -> bytes of the fallback copy, read once
+        self._parsed = {}  # name -> (bytes, parsed Lottie JSON)
+        self._downloading = set()  # names being downloaded
+        self._failures = {}  # name -> (failed downloads in a row, time of the next attempt)
+        self._lock = threading.Lock()
+        self._session = requests.Session()
+
+    def content(self, name):
+        """Bytes of asset ``name``, or None while it is being downloaded for the first time."""
+        with self._lock:
+            if name in self._memory:
+                return self._memory[name]
+        filename = asset_filename(name, self.assets)
+        content = _read(self.cache_dir / filename)
+        if content is not None:
+            with self._lock:
+                return self._memory.setdefault(name, content)  # unless a download just finished
+        self._download_in_background(name)
+        with self._lock:
+            if name not in self._failures:
+                return None
+            if name not in self._fallbacks:
+                self._fallbacks[name] = _read(self.fallback_dir / filename)
+            return self._fallbacks[name]
+
+    def lottie(self, name):
+        """Parsed Lottie animation ``name`` for st_lottie (EMPTY_LOTTIE while it is unavailable)."""
+        content = self.content(name)
+        if content is None:
+            return EMPTY_LOTTIE
+        with self._lock:
+            parsed = self._parsed.get(name)
+            if parsed is None or parsed[0] is not content:
+                parsed = self._parsed[name] = content, json.loads(content)
+            return parsed[1]
+
+    def image(self, name):
+        """Image ``name`` for st.image: its bytes, or EMPTY_IMAGE while it is unavailable."""
+        content = self.content(name)
+        return EMPTY_IMAGE if content is None else content
+
+    def download(self, name, directory=None):
+        """Download asset ``name`` into ``directory`` (the disk cache by default) and serve it from memory."""
+        url = self.assets[name]
+        with self._lock:
+            self.downloads += 1
+        response = self._session.get(url, timeout=self.timeout)
+        response.raise_for_status()
+        content = response.content
+        filename = asset_filename(name, self.assets)
+        if not is_valid(filename, content):  # never cache an error or login page as an asset
+            raise ValueError(f'{url} did not return a valid {filename}')
+        _write(Path(directory or self.cache_dir) / filename, content)
+        with self._lock:
+            self._memory[name] = content
+        return content
+
+    def _download_in_background(self, name):
+        with self._lock:
+            if name in self._downloading or time.time() < self._failures.get(name, (0, 0))[1]:
+                return
+            self._downloading.add(name)
+        threading.Thread(target=self._download_quietly, args=(name,), name='srr-asset', daemon=True).start()
+
+    def _download_quietly(self, name):
+        try:
+            self.download(name)
+        except Exception as error:
+            with self._lock:
+                failures = self._failures.get(name, (0, 0))[0] + 1
+                delay = min(self.retry_interval * 2 ** (failures - 1), self.max_retry_interval)
+                self._failures[name] = failures, time.time() + delay
+            logger.warning('Downloading asset %s failed, its fallback copy is shown and it is retried in %ss: %s', name, delay, error)
+        else:
+            with self._lock:
+                self._failures.pop(name, None)
+        finally:
+            with self._lock:
+                self._downloading.discard(name)
+
+
+_store = AssetStore()
+
+
+def lottie_asset(name):
+    """Lottie animation ``name`` from the process-wide asset store, for st_lottie."""
+    return _store.lottie(name)
+
+
+def image_asset(name):
+    """Image ``name`` from the process-wide asset store, for st.image."""
+    return _store.image(name)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    for name in ASSETS:
+        _store.download(name, FALLBACK_DIR)
+        logger.info('Saved %s as the fallback copy', asset_filename(name))
@@ -0,0 +1,210 @@
+import numpy as np
+import pandas as pd
+
+KEY_COLUMN = 'Case #'
+
+
+class RowDelta:
+    """Rows that differ between two versions of the sheet, matched on KEY_COLUMN.
+
+    ``added`` are positions in ``new``, ``removed`` positions in ``old`` and
+    ``changed_old`` / ``changed_new`` the two positions of each case whose
+    content changed.
+    """
+
+    def __init__(self, old, new, added, removed, changed_old, changed_new):
+        self.old = old
+        self.new = new
+        self.added = added
+        self.removed = removed
+        self.changed_old = changed_old
+        self.changed_new = changed_new
+
+    def __len__(self):
+        return len(self.added) + len(self.removed) + len(self.changed_new)
+
+    @property
+    def outgoing(self):
+        """Old versions of the removed and changed rows."""
+        return self.old.take(np.concatenate([self.removed, self.changed_old]))
+
+    @property
+    def incoming(self):
+        """New versions of the added and changed rows."""
+        return self.new.take(np.concatenate([self.added, self.changed_new]))
+
+
+def row_hashes(frame, columns=None):
+    """One uint64 per row over ``columns`` (all by default), for change detection."""
+    hashes = np.zeros(len(frame), dtype=np.uint64)
+    for column in (columns or frame.columns):
+        if column in frame:
+            hashes *= np.uint64(0x100000001B3)  # order-sensitive combination of the column hashes
+            hashes ^= pd.util.hash_pandas_object(frame[column], index=False).to_numpy()
+    return hashes
+
+
+def _match_keys(old_keys, new_keys):
+    # Position in old_keys of every new key (-1 for new cases), or None when keys repeat
+    if len(new_keys) >= len(old_keys) and np.array_equal(old_keys, new_keys[:len(old_keys)]):
+        # Appended rows only: the usual shape of a refresh, matched without hashing the keys
+        if new_keys.dtype.kind in 'iu':
+            unique = bool(np.all(new_keys[1:] > new_keys[:-1])) or pd.Index(new_keys).is_unique
+        else:
+            unique = pd.Index(new_keys).is_unique and not pd.isna(new_keys).any()
+        if not unique:
+            return None
+        position_in_old = np.full(len(new_keys), -1, dtype=np.intp)
+        position_in_old[:len(old_keys)] = np.arange(len(old_keys))
+        return position_in_old
+    old_index, new_index = pd.Index(old_keys), pd.Index(new_keys)
+    if not (old_index.is_unique and new_index.is_unique) or old_index.hasnans or new_index.hasnans:
+        return None
+    return old_index.get_indexer(new_index)
+
+
+def diff_frames(old, new, old_hashes=None, new_hashes=None, key=KEY_COLUMN):
+    """RowDelta between two frames, or None when ``key`` does not identify rows.
+
+    Rows are matched on ``key`` and compared through their row hashes, which
+    may be passed in when they are already known.
+    """
+    if key not in old or key not in new:
+        return None
+    position_in_old = _match_keys(old[key].to_numpy(), new[key].to_numpy())
+    if position_in_old is None:
+        return None
+    old_hashes = row_hashes(old) if old_hashes is None else old_hashes
+    new_hashes = row_hashes(new) if new_hashes is None else new_hashes
+
+    matched = position_in_old >= 0
+    changed_new = np.flatnonzero(matched)
+    changed_new = changed_new[old_hashes[position_in_old[changed_new]] != new_hashes[changed_new]]
+    kept = np.zeros(len(old), dtype=bool)
+    kept[position_in_old[matched]] = True
+    return RowDelta(old, new,
+                    added=np.flatnonzero(~matched),
+                    removed=np.flatnonzero(~kept),
+                    changed_old=position_in_old[changed_new],
+                    changed_new=changed_new)
+
+
+CHANGE_COLUMNS = ['Case #', 'Change', 'From', 'To', 'Service']  # one row per change, as in the changes panel
+NEW_CASE, STATUS_CHANGE, REASSIGNED = 'New case', 'Status', 'Reassigned'
+TRACKED_COLUMNS = {STATUS_CHANGE: 'Status', REASSIGNED: 'SME (On It)'}  # the per-case fields the feed follows
+QUEUED = 'In Queue'  # status of the cases no SME picked up yet
+
+
+def _join_cases(old_keys, new_keys):
+    # Hash join on the case number: positions in new of its cases (the last row of a repeated case)
+    # and the position in old of each of them (-1 for new cases)
+    position_in_old = _match_keys(old_keys, new_keys)
+    if position_in_old is not None:
+        return np.arange(len(new_keys)), position_in_old
+    old_keys, new_keys = pd.Series(old_keys), pd.Series(new_keys)
+    old_rows = np.flatnonzero((old_keys.notna() & ~old_keys.duplicated(keep='last')).to_numpy())
+    new_rows = np.flatnonzero((new_keys.notna() & ~new_keys.duplicated(keep='last')).to_numpy())
+    matched = pd.Index(old_keys.to_numpy()[old_rows]).get_indexer(new_keys.to_numpy()[new_rows])
+    return new_rows, np.where(matched >= 0, old_rows[matched], -1)
+
+
+def _tracked_hashes(snapshot):
+    # Value hashes of the followed columns, computed once per snapshot
+    frame = snapshot.frame
+    return snapshot.derive('tracked_hashes', lambda: {
+        column: row_hashes(frame, [column]) for column in TRACKED_COLUMNS.values() if column in frame})
+
+
+def _change_records(change, new, rows, column, old=None, old_rows=None):
+    # CHANGE_COLUMNS rows of one kind of change; From is the old value of ``column`` (None for new cases)
+    def values(frame, positions):
+        return frame[column].to_numpy()[positions].astype(object) if column in frame else None
+
+    return pd.DataFrame({
+        'Case #': new[KEY_COLUMN].to_numpy()[rows] if KEY_COLUMN in new else None,
+        'Change': change,
+        'From': None if old is None else values(old, old_rows),
+        'To': values(new, rows),
+        'Service': new['Service'].to_numpy()[rows].astype(object) if 'Service' in new else None,
+    }, index=pd.RangeIndex(len(rows)), columns=CHANGE_COLUMNS)
+
+
+class ChangeSet:
+    """Per-case changes from one snapshot to the next: new cases, status transitions and SME reassignments.
+
+    Cases are matched on KEY_COLUMN with a hash join and their Status and
+    SME (On It) compared through value hashes, so no row is compared in
+    Python. A reassignment is an SME replaced by another one on a case that
+    was already picked up; picking a case up is its In Queue -> In Progress
+    transition.
+    ``new_cases``, ``transitions`` and ``reassignments`` are positions in
+    the new snapshot's frame, for components updating themselves
+    incrementally; ``frame`` lists every change as CHANGE_COLUMNS rows (new
+    cases with their status, then transitions, then reassignments).
+    """
+
+    def __init__(self, old, new, key=KEY_COLUMN):
+        self.old_version = old.version
+        self.version = new.version
+        self.fetched_at = new.fetched_at
+        if key not in old.frame or key not in new.frame:
+            rows = position_in_old = np.array([], dtype=np.intp)
+        else:
+            rows, position_in_old = _join_cases(old.frame[key].to_numpy(), new.frame[key].to_numpy())
+        matched = position_in_old >= 0
+        self.new_cases = rows[~matched]
+        rows, position_in_old = rows[matched], position_in_old[matched]
+
+        old_hashes, new_hashes = _tracked_hashes(old), _tracked_hashes(new)
+        moved = {}  # change -> mask over the matched cases
+        for change, column in TRACKED_COLUMNS.items():
+            if column in old_hashes and column in new_hashes:
+                moved[change] = old_hashes[column][position_in_old] != new_hashes[column][rows]
+            else:
+                moved[change] = np.zeros(len(rows), dtype=bool)
+        sme, status = TRACKED_COLUMNS[REASSIGNED], TRACKED_COLUMNS[STATUS_CHANGE]
+        if sme in old.frame:  # a case getting its first SME is picked up, not reassigned
+            moved[REASSIGNED] &= old.frame[sme].notna().to_numpy()[position_in_old]
+        if status in old.frame:
+            moved[REASSIGNED] &= (old.frame[status] != QUEUED).to_numpy()[position_in_old]
+        self.transitions = rows[moved[STATUS_CHANGE]]
+        self.reassignments = rows[moved[REASSIGNED]]
+        # Built now, so that the change set keeps no reference to either snapshot's frame
+        self.frame = pd.concat([
+            _change_records(NEW_CASE, new.frame, self.new_cases, status),
+            _change_records(STATUS_CHANGE, new.frame, self.transitions, status,
+                            old.frame, position_in_old[moved[STATUS_CHANGE]]),
+            _change_records(REASSIGNED, new.frame, self.reassignments, sme,
+                            old.frame, position_in_old[moved[REASSIGNED]]),
+        ], ignore_index=True)
+
+    def __len__(self):
+        return len(self.frame)
+
+    @property
+    def cases(self):
+        """Case numbers touched by any change."""
+        return self.frame['Case #'].unique()
+
+    def summary(self):
+        """Short counts of the changes, e.g. ['2 new cases', '1 In Queue -> In Progress', '1 reassigned']."""
+        parts = []
+        if len(self.new_cases):
+            parts.append(f"{len(self.new_cases)} new case{'s' if len(self.new_cases) > 1 else ''}")
+        transitions = self.frame[self.frame['Change'] == STATUS_CHANGE]
+        for (before, after), count in transitions.groupby(['From', 'To'], dropna=False, sort=False).size().items():
+            parts.append(f'{count} {before} -> {after}')
+        if len(self.reassignments):
+            parts.append(f'{len(self.reassignments)} reassigned')
+        return parts
+
+
+def snapshot_changes(snapshot):
+    """ChangeSet from the snapshot ``snapshot`` replaced to ``snapshot``, computed once and shared.
+
+    None for the first snapshot, or once a newer one released the previous.
+    """
+    previous = snapshot.previous
+    if previous is None:
+        return snapshot.cached('changes')
+    return snapshot.derive('changes', lambda: ChangeSet(previous, snapshot))
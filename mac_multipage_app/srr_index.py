@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+
+FILTER_COLUMNS = ['Service', 'Month', 'Weekend?', 'Working Hours?', 'SME (On It)', 'Status']
+
+
+class FilterIndex:
+    """Row bitmaps for the sidebar filter columns of one snapshot.
+
+    Every value of every filter column gets a packed bitmap (one bit per row)
+    when the index is built. A filter combination is then a few bitwise ANDs
+    over those bitmaps, and the filtered frame is materialized once with
+    ``take``. ``rows`` arguments and results are such bitmaps; ``None`` stands
+    for "every row".
+    """
+
+    def __init__(self, frame, columns=FILTER_COLUMNS):
+        self.frame = frame
+        self.size = len(frame)
+        self._values = {}  # column -> values in order of first appearance
+        self._codes = {}  # column -> {value: position in _values}
+        self._bitmaps = {}  # column -> 2-D uint8 array, one packed bitmap per value
+        for column in columns:
+            if column not in frame:
+                continue
+            codes, uniques = pd.factorize(frame[column])  # missing values get code -1 and no bitmap
+            values = list(uniques)
+            bitmaps = np.empty((len(values), (self.size + 7) // 8), dtype=np.uint8)
+            for code in range(len(values)):
+                bitmaps[code] = np.packbits(codes == code)
+            self._values[column] = values
+            self._codes[column] = {value: code for code, value in enumerate(values)}
+            self._bitmaps[column] = bitmaps
+
+    def bitmap(self, column, value):
+        """Bitmap of the rows where ``column`` equals ``value``."""
+        code = self._codes[column].get(value)
+        if code is None:
+            return np.zeros((self.size + 7) // 8, dtype=np.uint8)
+        return self._bitmaps[column][code]
+
+    def match(self, column, value, rows=None):
+        """Narrow ``rows`` down to those where ``column`` equals ``value``."""
+        bitmap = self.bitmap(column, value)
+        return bitmap.copy() if rows is None else bitmap & rows
+
+    def match_any(self, column, values, rows=None):
+        """Narrow ``rows`` down to those where ``column`` is one of ``values``."""
+        bitmap = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+        for value in values:
+            bitmap |= self.bitmap(column, value)
+        return bitmap if rows is None else bitmap & rows
+
+    def options(self, column, rows=None):
+        """Distinct values of ``column`` within ``rows``, in order of first appearance.
+
+        Same as ``frame[column].unique()`` on the filtered frame, without
+        materializing it; missing values are left out.
+        """
+        values = self._values[column]
+        if rows is None:
+            return list(values)
+        hits = self._bitmaps[column] & rows
+        nonzero = hits != 0
+        present = np.flatnonzero(nonzero.any(axis=1))
+        if not len(present):
+            return []
+        first_byte = nonzero[present].argmax(axis=1)
+        first_bit = np.unpackbits(hits[present, first_byte][:, None], axis=1).argmax(axis=1)
+        order = np.argsort(first_byte * 8 + first_bit, kind='stable')
+        return [values[i] for i in present[order]]
+
+    def count(self, rows=None):
+        """Number of rows in ``rows``."""
+        if rows is None:
+            return self.size
+        return int(np.unpackbits(rows, count=self.size).sum())
+
+    def positions(self, rows):
+        """Row positions set in ``rows``."""
+        return np.flatnonzero(np.unpackbits(rows, count=self.size))
+
+    def take(self, rows=None, frame=None):
+        """The indexed frame (or ``frame``, a projection of it) restricted to ``rows``."""
+        frame = self.frame if frame is None else frame
+        if rows is None:
+            return frame
+        return frame.take(self.positions(rows))
+
+
+def filter_index(snapshot):
+    """The FilterIndex of a snapshot, built once and shared by every session."""
+    return snapshot.derive('filter_index', lambda: FilterIndex(snapshot.frame))
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+
+PAGE_SIZE = 10  # pivot rows per grid page
+TOTAL = 'Total'  # ``by`` value ordering the rows by their total count
+
+
+def pivot_keys(frame, rows='Requestor', columns='Service'):
+    """Sorted factorization of the ``rows`` and ``columns`` keys of a pivot, for SparsePivot."""
+    return {key: pd.factorize(frame[key], sort=True) for key in (rows, columns)}
+
+
+def pivot_codes(snapshot):
+    """pivot_keys of the Requestor x Service pivot of a snapshot, computed once."""
+    return snapshot.derive('pivot_codes', lambda: pivot_keys(snapshot.frame))
+
+
+class SparsePivot:
+    """Counts per (row key, column key) of a set of rows, storing only the non-zero cells.
+
+    Same numbers as ``pivot_table(index=rows, columns=columns, aggfunc='size',
+    fill_value=0, observed=True)``, but the counts are kept as sorted
+    (row, column, count) triples, so that ranking the rows and cutting a page
+    out of them never materializes the mostly-zero dense matrix. Rows are
+    numbered in key order; ``frame`` turns any of them into the dense layout.
+    """
+
+    def __init__(self, codes, positions=None):
+        """``codes`` is a pivot_keys result and ``positions`` the rows to count (all by default)."""
+        (self.row_name, (row_codes, row_keys)), (self.column_name, (column_codes, column_keys)) = codes.items()
+        if positions is not None:
+            row_codes, column_codes = row_codes[positions], column_codes[positions]
+        keep = (row_codes >= 0) & (column_codes >= 0)
+        cells, self.counts = np.unique(row_codes[keep].astype(np.int64) * len(column_keys) + column_codes[keep],
+                                       return_counts=True)
+        present_rows, self._row = np.unique(cells // len(column_keys), return_inverse=True)
+        present_columns, self._column = np.unique(cells % len(column_keys), return_inverse=True)
+        self.rows = np.asarray(row_keys, dtype=object)[present_rows]
+        self.columns = np.asarray(column_keys, dtype=object)[present_columns]
+        self._starts = np.searchsorted(self._row, np.arange(len(self.rows) + 1))  # cells of row i: starts[i]:starts[i+1]
+        self.totals = np.bincount(self._row, weights=self.counts, minlength=len(self.rows)).astype(np.int64)
+
+    def __len__(self):
+        return len(self.rows)
+
+    @property
+    def density(self):
+        """Share of the dense matrix that is non-zero."""
+        size = len(self.rows) * len(self.columns)
+        return len(self.counts) / size if size else 0.0
+
+    def column_counts(self, column):
+        """Count of every row in ``column`` (zeros included)."""
+        counts = np.zeros(len(self.rows), dtype=np.int64)
+        matches = np.flatnonzero(self.columns == column)
+        if len(matches):
+            in_column = self._column == matches[0]
+            counts[self._row[in_column]] = self.counts[in_column]
+        return counts
+
+    def order(self, by=None):
+        """Row numbers in key order (``by=None``), by TOTAL or by a column's count, largest first."""
+        if by is None:
+            return np.arange(len(self.rows))
+        values = self.totals if by == TOTAL else self.column_counts(by)
+        return np.argsort(-values, kind='stable')  # ties stay in key order
+
+    def top(self, k, by=TOTAL):
+        """Dense frame of the ``k`` rows with the largest TOTAL (or ``by`` column) count."""
+        return self.frame(self.order(by)[:k])
+
+    def page_count(self, size=PAGE_SIZE):
+        return -(-len(self.rows) // size)
+
+    def page(self, number, size=PAGE_SIZE, by=None):
+        """Dense frame of page ``number`` (from 0) of the rows ordered as in ``order(by)``."""
+        return self.frame(self.order(by)[number * size:(number + 1) * size])
+
+    def frame(self, rows=None):
+        """Dense pivot frame (keys in a first column) of the row numbers ``rows``, all by default."""
+        rows = np.arange(len(self.rows)) if rows is None else np.asarray(rows, dtype=np.int64)
+        starts, lengths = self._starts[rows], self._starts[rows + 1] - self._starts[rows]
+        cells = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        dense = np.zeros((len(rows), len(self.columns)), dtype=np.int64)
+        dense[np.repeat(np.arange(len(rows)), lengths), self._column[cells]] = self.counts[cells]
+        frame = pd.DataFrame(dense, columns=pd.Index(self.columns, name=self.column_name))
+        frame.insert(0, self.row_name, self.rows[rows])
+        return frame
@@ -0,0 +1,389 @@
+import copy
+import hashlib
+import io
+import logging
+import threading
+import time
+
+import pandas as pd
+import requests
+
+from srr_parsing import read_sheet
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 15  # seconds between two polls of the published sheet: how fresh the live queue panels are
+POLL_IDLE_TIMEOUT = 60  # seconds without a page asking for the latest snapshot after which polling stops
+ANALYTICS_INTERVAL = 600  # seconds the charts and summary tables stay on one snapshot (see get_analytics_snapshot)
+MIN_REFRESH_INTERVAL = 30  # "Refresh Data" clicks closer than this to the last one are no-ops
+
+
+class Snapshot:
+    """One published version of the sheet, shared by every session and page.
+
+    ``frame`` must be treated as read-only. Page-specific views of it (column
+    projections, indexes, other flavours of the CSV) go through ``derive`` so
+    they are built once per snapshot instead of once per rerun.
+    """
+
+    def __init__(self, frame, content, digest, version, fetched_at, previous=None):
+        self.frame = frame
+        self.content = content  # the raw CSV bytes
+        self.digest = digest  # sha1 of the CSV bytes
+        self.version = version  # increases by one every time the content changes
+        self.fetched_at = fetched_at
+        self.previous = previous  # the snapshot this one replaced, without its own history (see without_history)
+        self.pinned_after = None  # for a pinned lane (see SheetSource.pinned): the snapshot it pinned before this one
+        self._derived = {}
+        self._derived_lock = threading.RLock()
+
+    def derive(self, key, factory):
+        """Return ``factory()``, computed once for this snapshot under ``key``."""
+        with self._derived_lock:
+            if key not in self._derived:
+                self._derived[key] = factory()
+            return self._derived[key]
+
+    def cached(self, key):
+        """What ``derive`` already computed under ``key``, or None."""
+        with self._derived_lock:
+            return self._derived.get(key)
+
+    def without_history(self):
+        """This snapshot without links to older ones, sharing its frame and derived data.
+
+        Newer snapshots link to this copy, so history stays one level deep
+        without modifying a snapshot that sessions may still be reading.
+        """
+        if self.previous is None and self.pinned_after is None:
+            return self
+        trimmed = copy.copy(self)
+        trimmed.previous = trimmed.pinned_after = None
+        return trimmed
+
+    def project(self, columns=None, drop=None):
+        """Column projection of ``frame``, built once per snapshot."""
+        key = ('project', tuple(columns or ()), tuple(drop or ()))
+
+        def build():
+            frame = self.frame if columns is None else self.frame[list(columns)]
+            return frame.drop(columns=list(drop)) if drop else frame
+
+        return self.derive(key, build)
+
+    def read_csv(self, **kwargs):
+        """Parse the raw CSV again, e.g. for a page that needs every column untouched."""
+        return pd.read_csv(io.BytesIO(self.content), **kwargs)
+
+
+class _Flight:
+    """One in-flight fetch that any number of callers can wait on."""
+
+    def __init__(self):
+        self._done = threading.Event()
+        self._result = None
+        self._error = None
+
+    def resolve(self, result=None, error=None):
+        self._result, self._error = result, error
+        self._done.set()
+
+    def wait(self):
+        self._done.wait()
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+
+class SheetSource:
+    """Fetches a published CSV with conditional requests.
+
+    The parsed frame is kept between fetches: a 304 answer, or a 200 whose
+    body hashes to the same digest, keeps the current snapshot untouched.
+    Once a snapshot exists, failed fetches are logged and the last good
+    snapshot keeps being served. Concurrent fetches are coalesced: callers
+    arriving while one is in flight wait for it and share its result. Each
+    new snapshot is pushed to the subscribers waiting for one, so that
+    nothing needs to poll the source for changes. The source is polled in
+    the background only while someone watches it (see start_polling).
+    """
+
+    def __init__(self, url, parse=read_sheet, timeout=30):
+        self.url = url
+        self.parse = parse  # CSV bytes -> frame
+        self.timeout = timeout
+        self.snapshot = None
+        self.etag = None
+        self.last_modified = None
+        self.checked_at = None  # last time upstream was asked, whatever the answer
+        self.refreshed_at = None  # last manual refresh that fetched
+        self.verified_at = None  # last time upstream confirmed the snapshot is current
+        self.last_error = None  # exception from the latest fetch, None once one succeeds
+        self._session = requests.Session()
+        self._state_lock = threading.Lock()
+        self._flight = None
+        self._revalidating = False
+        self.watched_at = None  # last call to start_polling
+        self._poller = None
+        self._subscribers = {}  # key -> callback(snapshot)
+        self._pins = {}  # lane -> (snapshot, time it was pinned)
+
+    def _conditional_headers(self):
+        headers = {}
+        if self.snapshot is not None:
+            if self.etag:
+                headers['If-None-Match'] = self.etag
+            if self.last_modified:
+                headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+    def fetch(self):
+        """Ask upstream for changes and return the (possibly unchanged) snapshot.
+
+        If a fetch is already in flight, wait for it instead of starting another.
+        """
+        with self._state_lock:
+            flight, leader = self._flight, self._flight is None
+            if leader:
+                flight = self._flight = _Flight()
+        if not leader:
+            return flight.wait()
+
+        self.checked_at = time.time()
+        previous = self.snapshot
+        try:
+            self.snapshot = self._fetch()
+        except Exception as exc:
+            self.last_error = exc
+            flight.resolve(error=exc)
+            raise
+        else:
+            self.verified_at, self.last_error = self.checked_at, None
+            flight.resolve(self.snapshot)
+            if self.snapshot is not previous:
+                self._publish(self.snapshot)
+            return self.snapshot
+        finally:
+            with self._state_lock:
+                self._flight = None
+
+    @property
+    def version(self):
+        """Version of the current snapshot (0 before the first load); it only ever increases."""
+        snapshot = self.snapshot
+        return 0 if snapshot is None else snapshot.version
+
+    def pinned(self, lane, max_age):
+        """Snapshot of refresh ``lane``: the current one, but moving on at most once every ``max_age`` seconds.
+
+        A lane skips the snapshots published in between, so the one it moves
+        on to gets the one it leaves as ``pinned_after``: that is the
+        snapshot whose derived data (the cube) the lane already built.
+        """
+        now = time.time()
+        with self._state_lock:
+            pinned, since = self._pins.get(lane, (None, None))
+            if pinned is None or (pinned is not self.snapshot and now - since >= max_age):
+                snapshot, since = self._pins[lane] = self.snapshot, now
+                if pinned is not None and snapshot is not None and snapshot is not pinned:
+                    snapshot.pinned_after = pinned.without_history()
+                pinned = snapshot
+            return pinned
+
+    def subscribe(self, key, callback):
+        """Call ``callback(snapshot)`` on the fetching thread when the next new snapshot is published.
+
+        Subscriptions are one-shot and keyed: subscribing again under ``key``
+        (a session, say) replaces its pending subscription.
+        """
+        with self._state_lock:
+            self._subscribers[key] = callback
+
+    def unsubscribe(self, key):
+        with self._state_lock:
+            self._subscribers.pop(key, None)
+
+    def subscriber_count(self):
+        with self._state_lock:
+            return len(self._subscribers)
+
+    def _publish(self, snapshot):
+        with self._state_lock:
+            subscribers, self._subscribers = self._subscribers, {}
+        for key, callback in subscribers.items():
+            try:
+                callback(snapshot)
+            except Exception:
+                logger.exception('Notifying %r of version %s failed', key, snapshot.version)
+
+    def _fetch(self):
+        response = self._session.get(self.url, headers=self._conditional_headers(), timeout=self.timeout)
+        if response.status_code == 304 and self.snapshot is not None:
+            return self.snapshot
+        response.raise_for_status()
+
+        self.etag = response.headers.get('ETag')
+        self.last_modified = response.headers.get('Last-Modified')
+        digest = hashlib.sha1(response.content).hexdigest()
+        if self.snapshot is not None and digest == self.snapshot.digest:
+            return self.snapshot  # same bytes, only the validators may have moved
+
+        frame = self.parse(response.content)
+        previous = self.snapshot
+        if previous is None:
+            return Snapshot(frame, response.content, digest, 1, self.checked_at)
+        return Snapshot(frame, response.content, digest, previous.version + 1, self.checked_at,
+                        previous.without_history())
+
+    def get(self, max_age=120, stale_while_revalidate=False):
+        """Return a snapshot no older than ``max_age`` seconds, fetching if needed.
+
+        With ``stale_while_revalidate`` an expired snapshot is returned at once
+        and refreshed on a background thread; only the very first load blocks.
+        """
+        snapshot = self.snapshot
+        if snapshot is None:
+            return self.fetch()
+        if self.checked_at is not None and time.time() - self.checked_at < max_age:
+            return snapshot
+        if stale_while_revalidate:
+            self._revalidate_in_background()
+            return snapshot
+        try:
+            return self.fetch()
+        except Exception:
+            logger.exception('Refreshing %s failed, serving the previous snapshot', self.url)
+            return self.snapshot
+
+    def refresh(self, min_interval=MIN_REFRESH_INTERVAL):
+        """Manual refresh; returns False without fetching if another manual
+        refresh fetched less than ``min_interval`` seconds ago (the poller's
+        fetches do not count). Either way, every pinned lane moves on to the
+        current snapshot."""
+        now = time.time()
+        with self._state_lock:
+            in_flight = self._flight is not None
+            recent = self.refreshed_at is not None and now - self.refreshed_at < min_interval
+            fetched = in_flight or not recent
+            if fetched and not in_flight:
+                self.refreshed_at = now
+        if fetched:
+            try:
+                self.fetch()  # joins the in-flight fetch, if there is one
+            except Exception:
+                logger.exception('Refreshing %s failed, serving the previous snapshot', self.url)
+        with self._state_lock:
+            self._pins.clear()
+        return fetched
+
+    def _revalidate_in_background(self):
+        with self._state_lock:
+            if self._revalidating:
+                return
+            self._revalidating = True
+        threading.Thread(target=self._revalidate, name='srr-revalidate', daemon=True).start()
+
+    def _revalidate(self):
+        try:
+            self.fetch()
+        except Exception:
+            logger.exception('Background refresh of %s failed, serving the previous snapshot', self.url)
+        finally:
+            self._revalidating = False
+
+    def start_polling(self, interval=POLL_INTERVAL, idle_timeout=POLL_IDLE_TIMEOUT):
+        """Keep the background poller of this source running, starting it if needed.
+
+        The poller stops by itself once nobody called start_polling for
+        ``idle_timeout`` seconds, so a sheet nobody looks at is not polled.
+        """
+        with self._state_lock:
+            self.watched_at = time.time()
+            if self._poller is None:
+                self._poller = threading.Thread(target=self._poll, args=(interval, idle_timeout), name='srr-poller',
+                                                daemon=True)
+                self._poller.start()
+
+    @property
+    def polling(self):
+        """Whether the background poller runs."""
+        with self._state_lock:
+            return self._poller is not None
+
+    def _poll(self, interval, idle_timeout):
+        while True:
+            time.sleep(interval)
+            with self._state_lock:
+                if time.time() - self.watched_at >= idle_timeout:
+                    self._poller = None  # the next start_polling starts a new poller
+                    return
+            try:
+                self.fetch()
+            except Exception:
+                logger.exception('Polling %s failed, serving the previous snapshot', self.url)
+
+
+_sources = {}
+_sources_lock = threading.Lock()
+
+
+def get_source(url):
+    """Process-wide SheetSource for ``url``, shared by every session and page."""
+    with _sources_lock:
+        if url not in _sources:
+            _sources[url] = SheetSource(url)
+        return _sources[url]
+
+
+def get_snapshot(url, interval=POLL_INTERVAL):
+    """Latest snapshot of ``url`` published by its shared poller.
+
+    Reruns never wait for a fetch: the first call loads the sheet (blocking)
+    and starts the poller, which then publishes a new snapshot every
+    ``interval`` seconds whenever the sheet changed. Every call keeps the
+    poller going; once no page called for POLL_IDLE_TIMEOUT seconds (every
+    tab closed), it stops, and the next call refreshes an outdated snapshot
+    in the background and starts it again.
+    """
+    source = get_source(url)
+    snapshot = source.get(max_age=interval, stale_while_revalidate=True)
+    source.start_polling(interval)
+    return snapshot
+
+
+def get_analytics_snapshot(url, max_age=ANALYTICS_INTERVAL):
+    """Snapshot the heavy analytics (charts, SME summary, Requestor pivot, data table) are built from.
+
+    It follows get_snapshot at most once every ``max_age`` seconds, the
+    same snapshot for every session, so that reruns between two steps are
+    served from the view and chart caches while the live queue panels keep
+    following every new snapshot.
+    """
+    source = get_source(url)
+    get_snapshot(url)
+    return source.pinned('analytics', max_age)
+
+
+def refresh_snapshot(url, min_interval=MIN_REFRESH_INTERVAL):
+    """Blocking refresh for the "Refresh Data" button.
+
+    Only the shared snapshot is refreshed, and the analytics move on to it;
+    other caches are left alone.
+    Concurrent clicks share one fetch, clicks within ``min_interval`` seconds
+    of the last one that fetched are ignored, and a failed fetch keeps the old snapshot.
+    Returns whether a fetch was made.
+    """
+    return get_source(url).refresh(min_interval)
+
+
+def describe_freshness(source, now=None):
+    """Caption text saying how old the displayed data is."""
+    if source.verified_at is None:
+        return 'Loading data...'
+    now = time.time() if now is None else now
+    age = int(now - source.verified_at)
+    age_text = f'{age}s ago' if age < 120 else f'{age // 60} min ago'
+    text = f"Data as of {time.strftime('%H:%M:%S', time.localtime(source.verified_at))} ({age_text})"
+    if source.last_error is not None:
+        text += ' - latest refresh failed, showing the last good data'
+    return text
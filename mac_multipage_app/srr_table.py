@@ -0,0 +1,147 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from srr_changes import KEY_COLUMN
+from srr_views import ViewCache
+
+TABLE_PAGE_SIZE = 50  # rows sent to the browser per 'Show Data' page
+SHEET_ORDER = '(sheet order)'  # sort option keeping the rows as they are in the sheet
+SEARCH_CACHE_SIZE = 32  # search results kept per snapshot
+
+
+def _searchable(series):
+    # Text columns (and the case number) can be searched; timestamps and durations cannot
+    return (series.name == KEY_COLUMN or series.dtype == object or isinstance(series.dtype, pd.CategoricalDtype)
+            or pd.api.types.is_string_dtype(series.dtype))
+
+
+class TableIndex:
+    """Sort orders and search terms of the rows of one snapshot, for RowTable.
+
+    Each column's row order (its ``sort_values`` order, blanks last) is
+    computed the first time the column is sorted on, and each searchable
+    column is factorized once into codes and lower-cased distinct values, so
+    that a search scans the distinct values instead of every row. Orders and
+    search results are row positions / masks over the whole snapshot, valid
+    for any projection of it.
+    """
+
+    def __init__(self, frame):
+        self.frame = frame
+        self.size = len(frame)
+        self._orders = {}  # (column, ascending) -> row positions
+        self._terms = {}  # column -> (codes, lower-cased distinct values)
+        self._searches = ViewCache(SEARCH_CACHE_SIZE)
+        self._lock = threading.Lock()
+
+    def order(self, column, ascending=True):
+        """Positions of all rows sorted on ``column`` (stable, blanks last)."""
+        key = (column, ascending)
+        with self._lock:
+            if key not in self._orders:
+                values = pd.Series(self.frame[column].array)
+                self._orders[key] = values.sort_values(ascending=ascending, kind='stable',
+                                                       na_position='last').index.to_numpy()
+            return self._orders[key]
+
+    def _search_terms(self, column):
+        with self._lock:
+            if column not in self._terms:
+                codes, uniques = pd.factorize(self.frame[column])
+                self._terms[column] = codes, pd.Series(pd.Index(uniques).astype(str).str.lower())
+            return self._terms[column]
+
+    def search(self, query, columns=None):
+        """Mask of the rows where any searchable column (of ``columns``) contains ``query``, ignoring case."""
+        columns = tuple(self.frame.columns if columns is None else columns)
+        query = query.strip().lower()
+
+        def build():
+            found = np.zeros(self.size, dtype=bool)
+            for column in columns:
+                if column in self.frame and _searchable(self.frame[column]):
+                    codes, terms = self._search_terms(column)
+                    hits = np.flatnonzero(terms.str.contains(query, regex=False).to_numpy())
+                    if len(hits):
+                        found |= np.isin(codes, hits)
+            return found
+
+        return self._searches.get((query, columns), build)
+
+
+def table_index(snapshot):
+    """The TableIndex of a snapshot, shared by every session."""
+    return snapshot.derive('table_index', lambda: TableIndex(snapshot.frame))
+
+
+class RowTable:
+    """The rows of a filter selection, served a page at a time.
+
+    ``frame`` is a projection of the indexed snapshot and ``positions`` the
+    selected rows (all by default). Nothing is copied up front: ``page``
+    searches and sorts row positions against the TableIndex, then takes just
+    the rows of the page.
+    """
+
+    def __init__(self, index, frame, positions=None):
+        self.index = index
+        self.frame = frame
+        self.positions = positions
+
+    def __len__(self):
+        return self.index.size if self.positions is None else len(self.positions)
+
+    @property
+    def columns(self):
+        return list(self.frame.columns)
+
+    def query(self, search='', sort_by=None, ascending=True):
+        """Positions of the selected rows containing ``search``, sorted on ``sort_by`` (sheet order if None)."""
+        if self.positions is None and not search.strip():
+            selected = None
+        else:
+            selected = np.ones(self.index.size, dtype=bool)
+            if self.positions is not None:
+                selected[:] = False
+                selected[self.positions] = True
+            if search.strip():
+                selected &= self.index.search(search, self.frame.columns)
+        if sort_by is None:
+            return np.arange(self.index.size) if selected is None else np.flatnonzero(selected)
+        order = self.index.order(sort_by, ascending)
+        return order if selected is None else order[selected[order]]
+
+    def page(self, number, size=TABLE_PAGE_SIZE, search='', sort_by=None, ascending=True):
+        """Rows of page ``number`` (from 0) of ``query(search, sort_by, ascending)``, and the number of matches."""
+        positions = self.query(search, sort_by, ascending)
+        return self.frame.take(positions[number * size:(number + 1) * size]), len(positions)
+
+
+def show_table(table, key, label='Show Data', size=TABLE_PAGE_SIZE):
+    """Expander over a RowTable that renders nothing until it is opened.
+
+    Once open it shows a search box, a sort column and one page of ``size``
+    rows; searching, sorting and paging all happen on the server.
+    """
+    expander = st.expander(label, expanded=False, key=key, on_change='rerun')
+    with expander:
+        if not expander.open:
+            return
+        col1, col2, col3, col4 = st.columns([3, 2, 1, 1])
+        with col1:
+            search = st.text_input('Search', key=f'{key}_search', placeholder='Text in any column')
+        with col2:
+            sort_by = st.selectbox('Sort by', [SHEET_ORDER] + table.columns, key=f'{key}_sort')
+        with col3:
+            descending = st.toggle('Descending', key=f'{key}_descending')
+        sort_by = None if sort_by == SHEET_ORDER else sort_by
+        positions = table.query(search, sort_by, not descending)
+        pages = max(-(-len(positions) // size), 1)
+        with col4:
+            # Keyed on the page count, so that a narrower search starts again from page 1
+            number = st.number_input('Page', min_value=1, max_value=pages, value=1, key=f'{key}_page_{pages}',
+                                     help=f'{len(positions)} rows, {size} per page')
+        st.dataframe(table.frame.take(positions[(number - 1) * size:number * size]), use_container_width=True)
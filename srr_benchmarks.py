@@ -0,0 +1,815 @@
+"""Micro-benchmarks for the SRR dashboard helpers.
+
+Run from the repository root, e.g. ``python srr_benchmarks.py durations``.
+"""
+import argparse
+import contextlib
+import io
+import sys
+import threading
+import time
+
+import altair as alt
+import numpy as np
+import pandas as pd
+from streamlit.testing.v1 import AppTest
+
+from srr_parsing import (add_duration_columns, convert_to_seconds, convert_series_to_seconds, format_hms,
+                         parse_timestamps, prepare_raw_sheet, read_sheet)
+from srr_index import FilterIndex, filter_index
+from srr_charts import (CHART_SPEC_BUDGET, ChartCache, case_reason_pie, interaction_count_chart, interactions_handled_chart,
+                        monthly_response_chart, service_response_chart, sme_minutes_chart, spec_size)
+from srr_changes import QUEUED, ChangeSet, diff_frames, row_hashes
+from srr_cube import CUBE_COLUMNS, Cube
+from srr_sketch import QUANTILES, SKETCH_ACCURACY
+from srr_pivot import SparsePivot, pivot_keys
+from srr_live import has_newer_snapshot
+from srr_source import ANALYTICS_INTERVAL, POLL_INTERVAL, Snapshot, get_source
+from srr_table import TABLE_PAGE_SIZE, RowTable, TableIndex
+from srr_views import (DashboardView, ViewCache, cube_filters, dashboard_rollups, get_live_queues, get_view,
+                        interaction_counts, response_times, sme_summary)
+
+LEGACY_REFRESH_RATE = 120  # seconds of the pages' former time.sleep(refresh_rate); st.rerun() loop
+
+
+def make_durations(rows, seed=0):
+    """Synthetic 'TimeTo:' column with the blanks and junk seen in the sheet."""
+    rng = np.random.default_rng(seed)
+    seconds = rng.gamma(1.5, 900, rows).astype(int)
+    values = pd.Series([f"{s // 3600:02d}:{s % 3600 // 60:02d}:{s % 60:02d}" for s in seconds], dtype=object)
+    values[rng.random(rows) < 0.05] = np.nan
+    values[rng.random(rows) < 0.01] = '#VALUE!'
+    return values
+
+
+def make_sheet(rows, seed=0, requestors=300):
+    """Synthetic SRR sheet with the full set of published columns, as CSV bytes."""
+    rng = np.random.default_rng(seed)
+    smes = [f'@SME{i}' for i in range(25)]
+    created = pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 365 * 86400, rows), unit='s')
+    stamps = created.strftime('%m/%d/%Y %H:%M:%S')
+    df = pd.DataFrame({
+        'Case #': np.arange(1, rows + 1),
+        'Service': rng.choice(['Billing', 'Telephony', 'Reporting', 'Admin', 'Integrations'], rows),
+        'Inquiry': rng.choice(['How do I export a report?', 'Calls drop after 30s', 'Cannot log in'], rows),
+        'Requestor': rng.choice([f'agent{i}' for i in range(requestors)], rows),
+        'Creation Timestamp': stamps,
+        'In process (On It SME)': rng.choice(smes, rows),
+        'On It Time': stamps,
+        'Attendee': rng.choice(smes, rows),
+        'Attended Timestamp': stamps,
+        'Message Link': [f'https://chat.google.com/room/AAAA/{i}' for i in range(rows)],
+        'Status': rng.choice(['Done', 'In Queue', 'In Progress'], rows, p=[0.97, 0.015, 0.015]),
+        'Case Reason': rng.choice(['How-to', 'Bug', 'Configuration', None], rows),
+        'AFI': rng.choice(['Yes', 'No'], rows),
+        'AFI Comment': None,
+        'Article#': None,
+        'Month': created.strftime('%B'),
+        'Day': created.strftime('%A'),
+        'Weekend?': np.where(created.dayofweek >= 5, 'Yes', 'No'),
+        'Date Created': created.strftime('%m/%d/%Y'),
+        'Working Hours?': rng.choice(['Yes', 'No'], rows),
+        'TimeTo: On It': make_durations(rows, seed).to_numpy(),
+        'TimeTo: Attended': make_durations(rows, seed + 1).to_numpy(),
+        'Survey': np.where(rng.random(rows) < 0.3, rng.integers(1, 6, rows), np.nan),
+    })
+    return df.to_csv(index=False).encode()
+
+
+def timed(func, *args, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_durations(sizes):
+    print(f"{'rows':>10} {'apply (s)':>12} {'vectorized (s)':>16} {'speedup':>9}")
+    for rows in sizes:
+        values = make_durations(rows)
+        assert (values.apply(convert_to_seconds).to_numpy() == convert_series_to_seconds(values).to_numpy()).all()
+        slow = timed(lambda v: v.apply(convert_to_seconds), values)
+        fast = timed(convert_series_to_seconds, values)
+        print(f"{rows:>10} {slow:>12.4f} {fast:>16.4f} {slow / fast:>8.1f}x")
+
+
+def legacy_seconds_to_hms(seconds):
+    hours = seconds // 3600
+    minutes = (seconds % 3600) // 60
+    seconds = seconds % 60
+    return f"{int(hours):02d}:{int(minutes):02d}:{int(seconds):02d}"
+
+
+def bench_hms(sizes):
+    print(f"{'groups':>10} {'apply (s)':>12} {'vectorized (s)':>16} {'speedup':>9}")
+    rng = np.random.default_rng(0)
+    for groups in sizes:
+        means = pd.Series(rng.gamma(1.5, 900, groups))
+        assert (means.apply(legacy_seconds_to_hms) == format_hms(means)).all()
+        slow = timed(lambda v: v.apply(legacy_seconds_to_hms), means)
+        fast = timed(format_hms, means)
+        print(f"{groups:>10} {slow:>12.5f} {fast:>16.5f} {slow / fast:>8.1f}x")
+
+
+def bench_timestamps(sizes):
+    print(f"{'rows':>10} {'column':>20} {'inferred (s)':>13} {'cached format (s)':>18} {'speedup':>9}")
+    for rows in sizes:
+        sheet = pd.read_csv(io.BytesIO(make_sheet(rows)), usecols=['Date Created', 'Creation Timestamp'])
+        for column in sheet:
+            values = sheet[column]
+            expected = pd.to_datetime(values, errors='coerce')
+            assert parse_timestamps(values, column).equals(expected)
+            slow = timed(lambda v: pd.to_datetime(v, errors='coerce'), values)
+            fast = timed(parse_timestamps, values, column)
+            print(f"{rows:>10} {column:>20} {slow:>13.4f} {fast:>18.4f} {slow / fast:>8.1f}x")
+
+
+def cascading_filters(df, service, month, weekend, working_hours):
+    """The sidebar filters as the pages used to apply them, one scan per step."""
+    options = [list(df['Service'].unique())]
+    df_filtered = df[df['Service'] == service]
+    options.append(list(df_filtered['Month'].unique()))
+    df_filtered = df_filtered[df_filtered['Month'] == month]
+    df_filtered = df_filtered[df_filtered['Weekend?'] == weekend]
+    df_filtered = df_filtered[df_filtered['Working Hours?'] == working_hours]
+    options.append(list(df_filtered['SME (On It)'].dropna().unique()))
+    return df_filtered, options
+
+
+def indexed_filters(index, service, month, weekend, working_hours):
+    options = [index.options('Service')]
+    rows = index.match('Service', service)
+    options.append(index.options('Month', rows))
+    rows = index.match('Month', month, rows)
+    rows = index.match('Weekend?', weekend, rows)
+    rows = index.match('Working Hours?', working_hours, rows)
+    options.append(index.options('SME (On It)', rows))
+    return index.take(rows), options
+
+
+def bench_filters(sizes):
+    print(f"{'rows':>10} {'build (s)':>10} {'cascading (s)':>14} {'indexed (s)':>12} {'speedup':>9}")
+    for rows in sizes:
+        df = read_sheet(make_sheet(rows))
+        build = timed(FilterIndex, df, repeat=1)
+        index = FilterIndex(df)
+        selection = ('Billing', 'March', False, True)
+        expected, expected_options = cascading_filters(df, *selection)
+        got, got_options = indexed_filters(index, *selection)
+        assert got.equals(expected) and got_options == expected_options
+        slow = timed(cascading_filters, df, *selection)
+        fast = timed(indexed_filters, index, *selection)
+        print(f"{rows:>10} {build:>10.4f} {slow:>14.4f} {fast:>12.4f} {slow / fast:>8.1f}x")
+
+
+def legacy_tables(df_filtered):
+    """Tiles and tables as the pages used to compute them, from the raw filtered rows."""
+    agg_month = df_filtered.groupby('Month', observed=True).agg({
+        'TimeTo: On It Sec': 'mean',
+        'TimeTo: Attended Sec': 'mean'
+    }).reset_index()
+    df_grouped = df_filtered.groupby('SME (On It)', observed=True).agg(
+        Avg_On_It_Sec=pd.NamedAgg(column='TimeTo: On It Sec', aggfunc='mean'),
+        Avg_Attended_Sec=pd.NamedAgg(column='TimeTo: Attended Sec', aggfunc='mean'),
+        Number_of_Interactions=pd.NamedAgg(column='SME (On It)', aggfunc='count'),
+        Avg_Survey=pd.NamedAgg(column='Survey', aggfunc='mean')
+    ).reset_index()
+    df_grouped['Total_Avg_Sec'] = df_grouped['Avg_On_It_Sec'] + df_grouped['Avg_Attended_Sec']
+    return {
+        'tiles': [df_filtered['Service'].count(), df_filtered['TimeTo: On It'].dt.total_seconds().mean(),
+                  df_filtered['TimeTo: Attended'].dt.total_seconds().mean(), df_filtered['Survey'].mean(),
+                  df_filtered['Survey'].count()],
+        'agg_month': agg_month,
+        'agg_service': df_filtered.groupby('Service', observed=True)[['TimeTo: On It Sec', 'TimeTo: Attended Sec']].mean(),
+        'case_counts': df_filtered.groupby('Case Reason', observed=True)['Service'].count(),
+        'sme_summary': df_grouped.sort_values(by=['Total_Avg_Sec', 'Number_of_Interactions', 'Avg_Survey'],
+                                              ascending=[True, False, False]),
+    }
+
+
+def cube_tables(cube, mask):
+    rollups = dashboard_rollups(cube, mask)
+    totals = rollups['totals']
+    return {
+        'tiles': [rollups['cases']['n'], totals['on_it_sum'] / totals['on_it_n'],
+                  totals['attended_sum'] / totals['attended_n'], totals['survey_sum'] / totals['survey_n'],
+                  totals['survey_n']],
+        'agg_month': response_times(rollups['Month'], 'Month'),
+        'agg_service': response_times(rollups['Service'], 'Service'),
+        'case_counts': rollups['Case Reason'].set_index('Case Reason')['n'],
+        'sme_summary': sme_summary(rollups['SME (On It)'],
+                                   {name: cube.quantiles(name, 'SME (On It)', mask) for name in cube.sketches}),
+    }
+
+
+def check_cube(df, cube, selection):
+    """Assert that the cube rollups of one selection match the raw groupbys."""
+    filters = cube_filters(*selection)
+    mask = np.ones(len(df), dtype=bool)
+    for column, value in filters.items():
+        mask &= (df[column].isin(value) if isinstance(value, list) else df[column] == value).to_numpy(bool, na_value=False)
+    raw, rolled = legacy_tables(df[mask]), cube_tables(cube, cube.select(filters))
+    np.testing.assert_allclose(np.array(raw['tiles'], dtype=float), np.array(rolled['tiles'], dtype=float), rtol=1e-6)
+    for name, by in [('agg_month', 'Month'), ('agg_service', 'Service')]:
+        expected = raw[name].reset_index() if name == 'agg_service' else raw[name]
+        assert list(expected[by]) == list(rolled[name][by])
+        np.testing.assert_allclose(expected['TimeTo: On It Sec'], rolled[name]['TimeTo: On It Sec'])
+        np.testing.assert_allclose(expected['TimeTo: Attended Sec'], rolled[name]['TimeTo: Attended Sec'])
+    assert raw['case_counts'].to_dict() == rolled['case_counts'].to_dict()
+    expected, got = raw['sme_summary'], rolled['sme_summary']
+    assert list(expected['SME (On It)']) == list(got['SME'])
+    assert list(expected['Number_of_Interactions']) == list(got['Number_of_Interactions'])
+    np.testing.assert_allclose(expected['Avg_Survey'].astype(float), got['Avg_Survey'], rtol=1e-6)
+
+
+def bench_cube(sizes):
+    """Tiles and summary tables from raw groupbys vs cube rollups, per selection."""
+    selections = [('All', 'All', 'All', 'All', None), ('Billing', 'All', 'All', 'All', None),
+                  ('Billing', 'March', 'No', 'Yes', None), ('All', 'All', 'All', 'All', ('@SME1', '@SME3'))]
+    print(f"{'rows':>10} {'cells':>7} {'build (s)':>10} {'raw (s)':>9} {'rollup (s)':>11} {'speedup':>9}")
+    for rows in sizes:
+        df = read_sheet(make_sheet(rows))
+        build = timed(Cube, df, repeat=1)
+        cube = Cube(df)
+        for selection in selections:
+            check_cube(df, cube, selection)
+        masks = []
+        for selection in selections:
+            mask = np.ones(len(df), dtype=bool)
+            for column, value in cube_filters(*selection).items():
+                mask &= (df[column].isin(value) if isinstance(value, list) else df[column] == value).to_numpy(bool, na_value=False)
+            masks.append(mask)
+        slow = timed(lambda: [legacy_tables(df[mask]) for mask in masks])
+        fast = timed(lambda: [cube_tables(cube, cube.select(cube_filters(*selection))) for selection in selections])
+        print(f"{rows:>10} {len(cube):>7} {build:>10.4f} {slow:>9.4f} {fast:>11.4f} {slow / fast:>8.1f}x")
+
+
+def next_refresh(df, appended, changed, seed=0):
+    """The sheet one refresh later: ``appended`` new cases, ``changed`` cases picked up or closed."""
+    rng = np.random.default_rng(seed)
+    new = read_sheet(make_sheet(len(df) + appended, seed=seed + 1)).iloc[len(df):]
+    new['Case #'] += len(df)
+    df = pd.concat([df, new], ignore_index=True)
+    picked = rng.choice(len(df) - appended, changed, replace=False)
+    sme = df['SME (On It)'].cat.add_categories(['@SME99'])
+    sme.iloc[picked[::2]] = '@SME99'  # reassigned
+    df['SME (On It)'] = sme
+    df.loc[picked[1::2], 'TimeTo: Attended'] = pd.Timedelta(minutes=42)  # closed
+    df.loc[picked[1::2], 'TimeTo: Attended Sec'] = 42 * 60.0
+    return df
+
+
+def bench_delta(sizes, appended=50, changed=100):
+    """Cube of the next refresh: full rebuild vs patching the previous cube with the row delta."""
+    print(f"{'rows':>10} {'delta':>6} {'rebuild (s)':>12} {'patch (s)':>10} {'speedup':>9}")
+    for rows in sizes:
+        old = read_sheet(make_sheet(rows))
+        new = next_refresh(old, appended, changed)
+        base, old_hashes = Cube(old), row_hashes(old, CUBE_COLUMNS)
+
+        def patch():
+            delta = diff_frames(old, new, old_hashes, row_hashes(new, CUBE_COLUMNS))
+            cube = base.copy()
+            cube.apply_delta(delta)
+            return cube, delta
+
+        cube, delta = patch()
+        assert len(delta) == appended + changed and cube.matches(Cube(new))
+        slow = timed(Cube, new)
+        fast = timed(patch)
+        print(f"{rows:>10} {len(delta):>6} {slow:>12.4f} {fast:>10.4f} {slow / fast:>8.1f}x")
+
+
+def rowwise_changes(old, new):
+    """(new cases, status transitions, reassignments) counted row by row against a dict of the old cases."""
+    before = dict(zip(old['Case #'], zip(old['Status'], old['SME (On It)'])))
+    new_cases = transitions = reassignments = 0
+    for case, status, sme in zip(new['Case #'], new['Status'], new['SME (On It)']):
+        if case not in before:
+            new_cases += 1
+            continue
+        old_status, old_sme = before[case]
+        transitions += status != old_status
+        reassignments += (old_status != QUEUED and not pd.isna(old_sme) and sme != old_sme
+                          and not (pd.isna(sme) and pd.isna(old_sme)))
+    return new_cases, transitions, reassignments
+
+
+def bench_changes(sizes, appended=50, changed=100):
+    """Change feed of the next refresh: row-by-row comparison vs the hash-joined ChangeSet."""
+    print(f"{'rows':>10} {'changes':>8} {'row by row (s)':>15} {'hash join (s)':>14} {'speedup':>9}")
+    for rows in sizes:
+        old = read_sheet(make_sheet(rows))
+        new = next_refresh(old, appended, changed)
+        queued = np.flatnonzero((new['Status'] == 'In Queue').to_numpy())[:changed // 2]
+        new.loc[queued, 'Status'] = 'In Progress'  # picked up
+        counter = iter(range(1, 10**6))
+
+        def hash_join():
+            # Fresh snapshots, so that the per-snapshot value hashes are computed every time
+            previous = Snapshot(old, b'', 'changes-old', next(counter), time.time())
+            return ChangeSet(previous, Snapshot(new, b'', 'changes-new', next(counter), time.time(), previous))
+
+        changes = hash_join()
+        assert (len(changes.new_cases), len(changes.transitions), len(changes.reassignments)) == \
+            rowwise_changes(old, new)
+        slow, fast = timed(rowwise_changes, old, new), timed(hash_join)
+        print(f"{rows:>10} {len(changes):>8} {slow:>15.4f} {fast:>14.4f} {slow / fast:>8.1f}x")
+
+
+def exact_percentiles(df, by):
+    """Per-``by`` percentiles of the On It durations, straight from the rows."""
+    seconds = df['TimeTo: On It'].dt.total_seconds()
+    grouped = seconds.groupby(df[by], observed=True)
+    return pd.DataFrame({label: grouped.quantile(q, interpolation='lower') for label, q in QUANTILES.items()})
+
+
+def bench_percentiles(sizes):
+    """Per-SME p50/p90/p99 of a selection: exact groupby quantiles vs merged cube sketches."""
+    selections = [('All', 'All', 'All', 'All', None), ('Billing', 'All', 'All', 'All', None),
+                  ('Billing', 'March', 'No', 'Yes', None)]
+    print(f"{'rows':>10} {'entries':>8} {'exact (s)':>10} {'sketch (s)':>11} {'speedup':>9} {'max rel. error':>15}")
+    for rows in sizes:
+        df = read_sheet(make_sheet(rows))
+        cube = Cube(df)
+        frames = []
+        for selection in selections:
+            mask = np.ones(len(df), dtype=bool)
+            for column, value in cube_filters(*selection).items():
+                mask &= (df[column] == value).to_numpy(bool, na_value=False)
+            frames.append(df[mask])
+        worst = 0.0
+        for selection, frame in zip(selections, frames):
+            exact = exact_percentiles(frame, 'SME (On It)')
+            sketched = cube.quantiles('on_it', 'SME (On It)', cube.select(cube_filters(*selection))).loc[exact.index]
+            error = ((sketched - exact).abs() / exact.where(exact > 0)).max().max()
+            worst = max(worst, np.nan_to_num(error))
+        assert worst <= SKETCH_ACCURACY + 1e-9, worst
+        slow = timed(lambda: [exact_percentiles(frame, 'SME (On It)') for frame in frames])
+        fast = timed(lambda: [cube.quantiles('on_it', 'SME (On It)', cube.select(cube_filters(*selection)))
+                              for selection in selections])
+        entries = len(cube.sketches['on_it'].keys)
+        print(f"{rows:>10} {entries:>8} {slow:>10.4f} {fast:>11.4f} {slow / fast:>8.1f}x {worst:>15.4%}")
+
+
+@contextlib.contextmanager
+def counting_calls(targets):
+    """Count the calls of each (owner, attribute) in ``targets`` while the block runs.
+
+    Calls made from within another counted call (pivot_table grouping, say)
+    are not counted again.
+    """
+    counts = {name: 0 for owner, name in targets}
+    depth = [0]
+    originals = [(owner, name, getattr(owner, name)) for owner, name in targets]
+    for owner, name, original in originals:
+        def counted(*args, _name=name, _original=original, **kwargs):
+            counts[_name] += depth[0] == 0
+            depth[0] += 1
+            try:
+                return _original(*args, **kwargs)
+            finally:
+                depth[0] -= 1
+        setattr(owner, name, counted)
+    try:
+        yield counts
+    finally:
+        for owner, name, original in originals:
+            setattr(owner, name, original)
+
+
+def legacy_management(df_filtered):
+    """The Management View's grouped outputs as it used to compute them, one pass over the rows each."""
+    agg_month = df_filtered.groupby('Month', observed=True).agg({
+        'TimeTo: On It Sec': 'mean',
+        'TimeTo: Attended Sec': 'mean'
+    }).reset_index()
+    agg_service = df_filtered.groupby('Service', observed=True).agg({
+        'TimeTo: On It Sec': 'mean',
+        'TimeTo: Attended Sec': 'mean'
+    }).reset_index()
+    service_counts = df_filtered.groupby('Service', observed=True).size().reset_index(name='Interactions')
+    sme_counts = df_filtered.groupby('SME (On It)', observed=True).size().reset_index(name='Interactions')
+    case_counts = df_filtered.groupby('Case Reason', observed=True)['Service'].count().reset_index()
+    pivot_df = df_filtered.pivot_table(index='Requestor', columns='Service', aggfunc='size', fill_value=0,
+                                       observed=True).reset_index()
+    df_grouped = df_filtered.groupby('SME (On It)', observed=True).agg(
+        Avg_On_It_Sec=pd.NamedAgg(column='TimeTo: On It Sec', aggfunc='mean'),
+        Avg_Attended_Sec=pd.NamedAgg(column='TimeTo: Attended Sec', aggfunc='mean'),
+        Number_of_Interactions=pd.NamedAgg(column='SME (On It)', aggfunc='count'),
+        Avg_Survey=pd.NamedAgg(column='Survey', aggfunc='mean')
+    ).reset_index()
+    return agg_month, agg_service, service_counts, sme_counts, case_counts, pivot_df, df_grouped
+
+
+def single_pass_management(cube, mask, codes, positions):
+    """The same outputs from one dashboard_rollups pass over the cells and one SparsePivot count over the rows."""
+    rollups = dashboard_rollups(cube, mask)
+    return (response_times(rollups['Month'], 'Month'), response_times(rollups['Service'], 'Service'),
+            interaction_counts(rollups['Service'], 'Service'), interaction_counts(rollups['SME (On It)'], 'SME (On It)'),
+            rollups['Case Reason'], SparsePivot(codes, positions), rollups['SME (On It)'])
+
+
+def bench_pipeline(sizes):
+    """Management View outputs for a Service selection: separate groupbys vs the single-pass bundle."""
+    print(f"{'rows':>10} {'passes before':>14} {'passes after':>13} {'before (s)':>11} {'after (s)':>10} {'speedup':>9}")
+    for rows in sizes:
+        df = read_sheet(make_sheet(rows))
+        index, cube, codes = FilterIndex(df), Cube(df), pivot_keys(df)
+        selected = index.match('Service', 'Billing')
+        df_filtered, mask, positions = index.take(selected), cube.select({'Service': 'Billing'}), index.positions(selected)
+
+        before_outputs, after_outputs = legacy_management(df_filtered), single_pass_management(cube, mask, codes, positions)
+        expected, got = before_outputs[5], after_outputs[5].frame()
+        assert list(expected['Requestor']) == list(got['Requestor'])
+        assert (expected.drop(columns='Requestor').to_numpy() == got.drop(columns='Requestor').to_numpy()).all()
+        np.testing.assert_allclose(before_outputs[0]['TimeTo: On It Sec'], after_outputs[0]['TimeTo: On It Sec'])
+        assert list(before_outputs[3]['Interactions']) == list(after_outputs[3]['Interactions'])
+
+        with counting_calls([(pd.DataFrame, 'groupby'), (pd.DataFrame, 'pivot_table')]) as before:
+            legacy_management(df_filtered)
+        # After: one rollups pass over the selected cells and one SparsePivot count over the selected rows
+        with counting_calls([(pd.DataFrame, 'groupby'), (pd.DataFrame, 'pivot_table'), (Cube, 'rollups'),
+                             (sys.modules[__name__], 'SparsePivot')]) as after:
+            single_pass_management(cube, mask, codes, positions)
+        slow = timed(legacy_management, df_filtered)
+        fast = timed(single_pass_management, cube, mask, codes, positions)
+        print(f"{rows:>10} {sum(before.values()):>14} {sum(after.values()):>13} {slow:>11.4f} {fast:>10.4f} {slow / fast:>8.1f}x")
+
+
+def bench_pivot(sizes, requestors=5000, page_size=10):
+    """Requestor x Service grid page: dense pivot_table + iloc vs SparsePivot, and the payload sent."""
+    print(f"{'rows':>10} {'requestors':>11} {'density':>8} {'dense (s)':>10} {'sparse (s)':>11} {'speedup':>9} "
+          f"{'dense payload':>14} {'page payload':>13}")
+    for rows in sizes:
+        df = read_sheet(make_sheet(rows, requestors=requestors))
+        codes = pivot_keys(df)
+
+        def dense():
+            pivot_df = df.pivot_table(index='Requestor', columns='Service', aggfunc='size', fill_value=0, observed=True)
+            top = pivot_df.loc[pivot_df.sum(axis=1).sort_values(ascending=False, kind='stable').index[:page_size]]
+            return pivot_df, pivot_df.iloc[:page_size], top
+
+        def sparse():
+            pivot = SparsePivot(codes)
+            return pivot, pivot.page(0, page_size), pivot.top(page_size)
+
+        pivot_df, first, top = dense()
+        pivot, page, sparse_top = sparse()
+        assert (pivot.frame().set_index('Requestor').to_numpy() == pivot_df.to_numpy()).all()
+        assert (page.set_index('Requestor').to_numpy() == first.to_numpy()).all()
+        assert list(sparse_top['Requestor']) == list(top.index)
+        slow, fast = timed(dense), timed(sparse)
+        full_payload, page_payload = len(pivot_df.reset_index().to_json()), len(page.to_json())
+        print(f"{rows:>10} {len(pivot):>11} {pivot.density:>8.1%} {slow:>10.4f} {fast:>11.4f} {slow / fast:>8.1f}x "
+              f"{full_payload / 1024:>11.0f} KiB {page_payload / 1024:>9.1f} KiB")
+
+
+def dashboard_charts(view):
+    """Every chart of the Agent and Management views, as the pages build them."""
+    return {
+        'monthly': monthly_response_chart(view.agg_month),
+        'service': service_response_chart(view.agg_service),
+        'interaction count': interaction_count_chart(view.service_counts),
+        'interactions handled': interactions_handled_chart(view.sme_counts),
+        'case reasons': case_reason_pie(view.case_counts),
+        'on it by SME': sme_minutes_chart(view.sme_summary, 'Avg_On_It_Min', 'On It', 'Minutes', highlight_above=5),
+        'attended by SME': sme_minutes_chart(view.sme_summary, 'Avg_Attended_Min', 'Attended', 'Minutes'),
+    }
+
+
+def legacy_count_charts(df_filtered):
+    """chart3 / chart4 as they used to be: raw rows, counted by Vega in the browser."""
+    chart3 = alt.Chart(df_filtered).mark_bar().encode(x='Service', y=alt.Y('count()', title='Count of Records'))
+    chart4 = alt.Chart(df_filtered).mark_bar().encode(y=alt.Y('SME (On It):N', sort='-x'), x=alt.X('count()'))
+    return chart3, chart4
+
+
+def bench_charts(sizes):
+    """Serialized size of every dashboard chart; fails if one exceeds CHART_SPEC_BUDGET."""
+    for rows in sizes:
+        df = read_sheet(make_sheet(rows))
+        index, cube = FilterIndex(df), Cube(df)
+        view = DashboardView(index, None, df, cube, cube.select({}), pivot_keys(df))
+        sizes_ = {name: spec_size(chart) for name, chart in dashboard_charts(view).items()}
+        print(f"{rows} rows: " + ', '.join(f'{name} {size / 1024:.1f} KiB' for name, size in sizes_.items()))
+        if rows <= 100_000:  # the raw-row specs grow by ~1 KiB per case
+            raw = df.drop(columns=['TimeTo: On It', 'TimeTo: Attended'])  # timedeltas do not serialize
+            with alt.data_transformers.disable_max_rows():
+                legacy = sum(spec_size(chart) for chart in legacy_count_charts(raw))
+            print(f"{'':>{len(str(rows))}}  chart3 + chart4: {legacy / 2**20:.1f} MiB from raw rows -> "
+                  f"{(sizes_['interaction count'] + sizes_['interactions handled']) / 1024:.1f} KiB pre-aggregated")
+        over = {name: size for name, size in sizes_.items() if size > CHART_SPEC_BUDGET}
+        assert not over, f'charts over the {CHART_SPEC_BUDGET} byte budget: {over}'
+
+
+def bench_chart_cache(sizes, reruns=20):
+    """``reruns`` reruns without new data: rebuilding every chart vs the chart cache, with per-chart hit rates."""
+    charts = [(monthly_response_chart, 'agg_month', {}), (service_response_chart, 'agg_service', {}),
+              (interaction_count_chart, 'service_counts', {}), (interactions_handled_chart, 'sme_counts', {}),
+              (case_reason_pie, 'case_counts', {}),
+              (sme_minutes_chart, 'sme_summary', {'column': 'Avg_On_It_Min', 'title': 'On It', 'axis_title': 'Minutes',
+                                                  'highlight_above': 5}),
+              (sme_minutes_chart, 'sme_summary', {'column': 'Avg_Attended_Min', 'title': 'Attended', 'axis_title': 'Minutes'})]
+    print(f"{'rows':>10} {'rebuilt (s)':>12} {'cached (s)':>11} {'speedup':>9}")
+    for rows in sizes:
+        df = read_sheet(make_sheet(rows))
+        cube = Cube(df)
+        view = DashboardView(FilterIndex(df), None, df, cube, cube.select({}), pivot_keys(df))
+
+        def rebuild():
+            for build, name, options in charts:
+                chart = build(getattr(view, name), **options)
+                chart.to_dict()  # what Streamlit does with a chart object on every rerun
+
+        cache = ChartCache()
+        slow = timed(lambda: [rebuild() for _ in range(reruns)], repeat=1)
+        fast = timed(lambda: [[cache.get(build, getattr(view, name), **options) for build, name, options in charts]
+                              for _ in range(reruns)], repeat=1)
+        print(f"{rows:>10} {slow:>12.4f} {fast:>11.4f} {slow / fast:>8.1f}x")
+    for name, stats in cache.stats().items():
+        print(f"  {name:<28} hits {stats['hits']:>3}  misses {stats['misses']:>2}  hit rate {stats['hit_rate']:.0%}")
+
+
+def bench_views(sizes, sessions=20):
+    """Cost of a rerun for ``sessions`` sessions on the same selection, without and with the view cache."""
+    print(f"{'rows':>10} {'uncached (s)':>13} {'cached (s)':>11} {'speedup':>9}  cache stats")
+    for rows in sizes:
+        df = read_sheet(make_sheet(rows))
+        index = FilterIndex(df)
+        rows_ = index.match('Service', 'Billing')
+        cube = Cube(df)
+        codes = pivot_keys(df)
+        build = lambda: DashboardView(index, rows_, df, cube, cube.select({'Service': 'Billing'}), codes)
+        slow = timed(lambda: [build() for _ in range(sessions)], repeat=1)
+        cache = ViewCache()
+        fast = timed(lambda: [cache.get(('Billing',), build) for _ in range(sessions)], repeat=1)
+        print(f"{rows:>10} {slow:>13.4f} {fast:>11.4f} {slow / fast:>8.1f}x  {cache.stats()}")
+
+
+def bench_table(sizes, search='billing', sort_by='TimeTo: On It'):
+    """'Show Data': the whole filtered frame on every rerun vs one page of a RowTable, and the payload sent."""
+    print(f"{'rows':>10} {'selected':>9} {'full (s)':>9} {'page (s)':>9} {'first sort (s)':>15} {'search+sort (s)':>16} "
+          f"{'full payload':>13} {'page payload':>13}")
+    for rows in sizes:
+        df = read_sheet(make_sheet(rows))
+        index = FilterIndex(df)
+        selected = index.match('Weekend?', False)
+        positions = index.positions(selected)
+        df_filtered = index.take(selected)
+        text = [column for column in df if df[column].dtype == object or isinstance(df[column].dtype, pd.CategoricalDtype)]
+        found = np.zeros(len(df_filtered), dtype=bool)
+        for column in text + ['Case #']:
+            found |= df_filtered[column].astype(str).str.lower().str.contains(search, regex=False).to_numpy()
+        expected = df_filtered[found].sort_values(sort_by, kind='stable').head(TABLE_PAGE_SIZE)
+
+        table = RowTable(TableIndex(df), df, positions)
+        page, matches = table.page(0, search=search, sort_by=sort_by)
+        assert matches == found.sum() and page.equals(expected)
+        assert table.page(0)[0].equals(df_filtered.head(TABLE_PAGE_SIZE))
+        full = timed(lambda: index.take(selected).to_json(), repeat=1)
+        first = timed(lambda: table.page(0)[0].to_json())
+        cold = timed(lambda: RowTable(TableIndex(df), df, positions).page(0, sort_by=sort_by), repeat=1)
+        warm = timed(lambda: table.page(3, search=search, sort_by=sort_by, ascending=False))
+        print(f"{rows:>10} {len(positions):>9} {full:>9.4f} {first:>9.4f} {cold:>15.4f} {warm:>16.4f} "
+              f"{len(df_filtered.to_json()) / 1024:>9.0f} KiB {len(page.to_json()) / 1024:>9.1f} KiB")
+
+
+# Scripts of the two pages bench_refresh opens sessions on; both render the dashboard view of the shared snapshot
+REFRESH_PAGE = """
+import time
+
+import streamlit as st
+
+from srr_cube import Cube
+from srr_index import FilterIndex
+from srr_live import live_panels
+from srr_pivot import pivot_keys
+from srr_source import get_source
+from srr_views import DashboardView
+
+snapshot = get_source({url!r}).snapshot
+frame = snapshot.frame
+render = lambda: DashboardView(FilterIndex(frame), None, frame, Cube(frame), None, pivot_keys(frame))
+st.session_state.renders = st.session_state.get('renders', 0) + 1
+if {legacy!r}:
+    view = render()
+    st.metric('Interactions', view.case_count)
+    time.sleep({interval!r})
+    st.rerun()
+else:
+    view = snapshot.derive('bench_refresh', render)
+    st.metric('Interactions', view.case_count)
+    live_panels({url!r}, snapshot, lambda latest: st.metric('Open cases', len(latest.frame)))
+"""
+
+
+def sample_threads(stop, samples, period=0.01):
+    while not stop.wait(period):
+        samples.append(threading.active_count())
+
+
+def bench_refresh(session_counts, interval=0.1, window=1.0, rows=10_000, period=0.01):
+    """Auto-refresh of N open dashboards on a sheet that does not change, each open for ``window`` seconds.
+
+    Each session is an AppTest run of a page on the same snapshot. Legacy:
+    the page renders, sleeps ``interval`` and reruns, as the pages did with
+    time.sleep(refresh_rate); st.rerun(); AppTest stops it after ``window``.
+    live_panels: the page renders once and ends with the live panels
+    fragment. AppTest runs one session at a time (it swaps Streamlit's
+    runtime for each run), so threading.active_count() is sampled during
+    each run: the thread-seconds a session holds per ``window``, times N,
+    is the number of threads N concurrent sessions keep busy. The count
+    left above the baseline once all N sessions have run shows what the
+    open sessions still hold. AppTest has no browser, so the fragment's
+    timer never fires here; each tick would be one short fragment run.
+    """
+    url = 'bench://refresh'
+    get_source(url).snapshot = Snapshot(read_sheet(make_sheet(rows)), b'', 'static', 1, time.time())
+    get_source(url).checked_at = get_source(url).verified_at = time.time()  # fresh: never fetched
+    print(f"{'sessions':>9} {'page':>7} {'busy threads':>13} {'threads left':>13} {'renders':>8} {'errors':>7}")
+    for sessions in session_counts:
+        for mode in ('legacy', 'live'):
+            script = REFRESH_PAGE.format(url=url, legacy=mode == 'legacy', interval=interval)
+            tests, samples, errors = [], [], []
+            before = threading.active_count()
+            for _ in range(sessions):
+                test = AppTest.from_string(script)
+                stop, run_samples = threading.Event(), []
+                sampler = threading.Thread(target=sample_threads, args=(stop, run_samples, period))
+                sampler.start()
+                started = time.perf_counter()
+                try:
+                    test.run(timeout=window)
+                except RuntimeError as error:  # the legacy page never ends: AppTest stops it at the timeout
+                    if 'timed out' not in str(error):
+                        errors.append(error)
+                elapsed = time.perf_counter() - started
+                stop.set()
+                sampler.join()
+                # Mean threads above the baseline (sampler excluded) while the run lasted, over the whole window
+                extra = np.array(run_samples or [before + 1]) - before - 1
+                samples.append(extra.mean() * min(elapsed, window) / window)
+                errors += [exception.value for exception in test.exception]
+                tests.append(test)  # the sessions stay open
+            left = threading.active_count() - before
+            renders = sum(test.session_state['renders'] for test in tests if 'renders' in test.session_state)
+            print(f"{sessions:>9} {mode:>7} {sessions * np.mean(samples):>13.1f} {left:>13} {renders:>8} {len(errors):>7}")
+
+
+class SheetResponse:
+    """Stand-in for the published sheet's HTTP answer."""
+
+    status_code = 200
+    headers = {}
+
+    def __init__(self, content):
+        self.content = content
+
+    def raise_for_status(self):
+        pass
+
+
+def bench_reruns(session_counts, change_every=None, hour=3600, interval=POLL_INTERVAL):
+    """Page reruns per hour of N open dashboards, the sheet unchanged (or changing every ``change_every`` s).
+
+    One poll per ``interval`` seconds of a real SheetSource is simulated;
+    ``sleep loop`` is the former time.sleep(LEGACY_REFRESH_RATE); st.rerun()
+    (one rerun per session every 120 s, whatever the poll), ``timer`` the
+    live panels fragment ticking every ``interval`` seconds (a fragment run,
+    not a page rerun) and seeing a new version, and ``push`` the fragment
+    runs pushed to subscribed sessions, which subscribe again on every run.
+    """
+    print(f"{'sessions':>9} {'sleep loop':>11} {'timer ticks':>12} {'timer reruns':>13} {'push reruns':>12} {'subscribers':>12}")
+    for sessions in session_counts:
+        source = get_source(f'bench://reruns/{sessions}/{change_every}')
+        content = [b'Case #\n1\n']
+        source.parse = lambda content: pd.read_csv(io.BytesIO(content))
+        source._session.get = lambda url, **kwargs: SheetResponse(content[0])
+        source.fetch()
+        counts = {'sleep loop': sessions * (hour // LEGACY_REFRESH_RATE), 'timer ticks': 0, 'timer reruns': 0,
+                  'push reruns': 0}
+        timer_versions = [source.version] * sessions
+
+        def subscribe(session):
+            def rerun(snapshot):
+                counts['push reruns'] += 1
+                subscribe(session)  # the rerun renders the page, which subscribes again
+            source.subscribe(session, rerun)
+
+        for session in range(sessions):
+            subscribe(session)
+        for now in range(interval, hour + 1, interval):
+            if change_every and now % change_every < interval:
+                content[0] += f'{now}\n'.encode()
+            source.fetch()  # the poller
+            for session in range(sessions):
+                counts['timer ticks'] += 1
+                if has_newer_snapshot(source.url, timer_versions[session]):
+                    counts['timer reruns'] += 1
+                    timer_versions[session] = source.version
+        print(f"{sessions:>9} {counts['sleep loop']:>11} {counts['timer ticks']:>12} {counts['timer reruns']:>13} "
+              f"{counts['push reruns']:>12} {source.subscriber_count():>12}")
+
+
+def filter_index_rows(snapshot, selection):
+    """Sidebar bitmap of a (service, month, weekend, working hours, SME) ``selection``, as the pages build it."""
+    index = filter_index(snapshot)
+    service, month, weekend, working_hours, sme = selection
+    rows = None if service == 'All' else index.match('Service', service)
+    if month != 'All':
+        rows = index.match('Month', month, rows)
+    if weekend != 'All':
+        rows = index.match('Weekend?', weekend == 'Yes', rows)
+    if working_hours != 'All':
+        rows = index.match('Working Hours?', working_hours == 'Yes', rows)
+    if sme and 'All' not in sme:
+        rows = index.match_any('SME (On It)', sme)
+    return rows
+
+
+def bench_lanes(sizes, appended=5, changed=10, selection=('Billing', 'All', 'All', 'All', ['All'])):
+    """Work done for one new snapshot: rebuilding the whole view vs the live queue lane only.
+
+    With a single lane every new snapshot rebuilds the filter index and the
+    view (cube patched from the previous one); with the tiered refresh only
+    the queue tables of the status projection are rebuilt, the analytics
+    staying on their pinned snapshot (a view cache hit).
+    """
+    print(f"{'rows':>10} {'single lane (s)':>16} {'live lane (s)':>14} {'speedup':>9} "
+          f"{'analytics rebuilds/h':>21}")
+    for rows in sizes:
+        old = read_sheet(make_sheet(rows))
+        new = next_refresh(old, appended, changed)
+        pinned = Snapshot(old, b'', f'lanes-{rows}', 1, time.time())
+        get_view(pinned, 'lanes', selection, filter_index_rows(pinned, selection), old)  # warm: the pinned view
+        counter = iter(range(2, 10**6))
+
+        def next_snapshot():
+            return Snapshot(new, b'', f'lanes-{rows}', next(counter), time.time(), previous=pinned)
+
+        def single_lane():
+            snapshot = next_snapshot()
+            return get_view(snapshot, 'lanes', selection, filter_index_rows(snapshot, selection), new)
+
+        def live_lane():
+            get_view(pinned, 'lanes', selection, None, old)
+            return get_live_queues(next_snapshot(), selection)
+
+        queues = live_lane()
+        view = single_lane()
+        assert len(queues.in_queue) == (new.loc[view.positions, 'Status'] == 'In Queue').sum()
+        slow, fast = timed(single_lane), timed(live_lane)
+        polls = 3600 // POLL_INTERVAL
+        print(f"{rows:>10} {slow:>16.4f} {fast:>14.4f} {slow / fast:>8.1f}x "
+              f"{polls:>10} -> {3600 // ANALYTICS_INTERVAL:<4}")
+
+
+def legacy_read_sheet(content):
+    return add_duration_columns(prepare_raw_sheet(pd.read_csv(io.BytesIO(content))))
+
+
+def bench_memory(sizes):
+    """Footprint of one loaded snapshot, untyped read vs SHEET_SCHEMA."""
+    for rows in sizes:
+        content = make_sheet(rows)
+        before = legacy_read_sheet(content).memory_usage(deep=True, index=False)
+        after = read_sheet(content).memory_usage(deep=True, index=False)
+        report = pd.DataFrame({'before (KiB)': before / 1024, 'after (KiB)': after / 1024}).round(1)
+        print(f"{rows} rows")
+        print(report.fillna('-').to_string())
+        print(f"{'total':>22} {before.sum() / 2**20:>9.2f} MiB -> {after.sum() / 2**20:.2f} MiB "
+              f"({before.sum() / after.sum():.1f}x smaller)\n")
+
+
+BENCHMARKS = {
+    'changes': lambda args: bench_changes(args.sizes),
+    'chartcache': lambda args: bench_chart_cache(args.sizes),
+    'charts': lambda args: bench_charts(args.sizes),
+    'cube': lambda args: bench_cube(args.sizes),
+    'delta': lambda args: bench_delta(args.sizes),
+    'durations': lambda args: bench_durations(args.sizes),
+    'filters': lambda args: bench_filters(args.sizes),
+    'hms': lambda args: bench_hms(args.sizes),
+    'lanes': lambda args: bench_lanes(args.sizes),
+    'memory': lambda args: bench_memory(args.sizes),
+    'percentiles': lambda args: bench_percentiles(args.sizes),
+    'pivot': lambda args: bench_pivot(args.sizes),
+    'pipeline': lambda args: bench_pipeline(args.sizes),
+    'refresh': lambda args: bench_refresh(args.sessions),
+    'reruns': lambda args: (bench_reruns(args.sessions), bench_reruns(args.sessions, change_every=600)),
+    'table': lambda args: bench_table(args.sizes),
+    'timestamps': lambda args: bench_timestamps(args.sizes),
+    'views': lambda args: bench_views(args.sizes),
+}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('benchmark', choices=sorted(BENCHMARKS))
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--sessions', type=int, nargs='+', default=[10, 50, 200])
+    args = parser.parse_args()
+    BENCHMARKS[args.benchmark](args)
@@ -0,0 +1,295 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+from srr_changes import diff_frames, row_hashes
+from srr_sketch import QUANTILES, CellSketches, histogram_quantiles
+
+logger = logging.getLogger(__name__)
+
+CUBE_DIMENSIONS = ['Month', 'Service', 'SME (On It)', 'Weekend?', 'Working Hours?', 'Case Reason']
+MEASURES = ['n', 'on_it_sum', 'on_it_n', 'attended_sum', 'attended_n', 'survey_sum', 'survey_n']
+COUNTS = ['n', 'on_it_n', 'attended_n', 'survey_n']
+SKETCHES = {'on_it': 'TimeTo: On It', 'attended': 'TimeTo: Attended'}  # durations with per-cell quantile sketches
+# Columns whose changes move cases between cells or change their measures (the Sec columns follow TimeTo:)
+CUBE_COLUMNS = CUBE_DIMENSIONS + ['TimeTo: On It', 'TimeTo: Attended', 'Survey']
+
+MIN_DELTA_ROWS = 50_000  # below this many cases a rebuild is about as fast as patching the previous cube
+MAX_DELTA_FRACTION = 0.25  # above this share of changed rows, rebuilding the cube is cheaper than patching it
+VERIFY_DELTAS = False  # check every incrementally maintained cube against a full recompute
+
+
+def cube_measures(frame):
+    """Per-row measures that the cube adds up, as a (rows, len(MEASURES)) float array."""
+    survey = frame['Survey'] if 'Survey' in frame else pd.Series(np.nan, index=frame.index)
+    return np.column_stack([
+        np.ones(len(frame)),
+        frame['TimeTo: On It Sec'],  # 0 for blank cells, so on_it_sum / n is the summary-table mean
+        frame['TimeTo: On It'].notna(),  # and on_it_sum / on_it_n the overall average
+        frame['TimeTo: Attended Sec'],
+        frame['TimeTo: Attended'].notna(),
+        survey.fillna(0),
+        survey.notna(),
+    ]).astype(np.float64)
+
+
+def sketch_seconds(frame, column):
+    """Durations of a 'TimeTo:' column in seconds, NaN where blank."""
+    return frame[column].dt.total_seconds().to_numpy(dtype=float, na_value=np.nan)
+
+
+def ratio(numerator, denominator):
+    """numerator / denominator for scalars or Series, NaN where the denominator is 0."""
+    if np.ndim(denominator) == 0:
+        return numerator / denominator if denominator else np.nan
+    return numerator / denominator.where(denominator != 0)
+
+
+class Cube:
+    """Measures of one snapshot pre-aggregated over every combination of CUBE_DIMENSIONS.
+
+    Each dimension's values are kept once, in groupby order, in ``members``;
+    a cell stores the member code of each dimension (-1 for a missing value),
+    the sums of the MEASURES over its cases and, in ``sketches``, a quantile
+    sketch of each of the SKETCHES durations. Every dashboard figure is a
+    rollup of (a selection of) the cells, so its cost follows the number of
+    distinct dimension values instead of the number of cases.
+    """
+
+    def __init__(self, frame, dimensions=CUBE_DIMENSIONS):
+        self.dimensions = [dimension for dimension in dimensions if dimension in frame]
+        self.members = {}
+        row_codes = []
+        for dimension in self.dimensions:
+            codes, uniques = pd.factorize(frame[dimension], sort=True)
+            self.members[dimension] = np.asarray(uniques, dtype=object)
+            row_codes.append(codes)
+
+        # One integer key per combination (codes shifted by one so that -1 fits)
+        shape = [len(self.members[dimension]) + 1 for dimension in self.dimensions]
+        keys = np.ravel_multi_index([codes + 1 for codes in row_codes], shape) if row_codes else np.zeros(len(frame), dtype=np.int64)
+        cell_keys, cell_of_row = np.unique(keys, return_inverse=True)
+        cell_codes = np.unravel_index(cell_keys, shape) if row_codes else []
+        self.codes = {dimension: codes - 1 for dimension, codes in zip(self.dimensions, cell_codes)}
+
+        measures = cube_measures(frame)
+        self.measures = np.column_stack([
+            np.bincount(cell_of_row, weights=measures[:, j], minlength=len(cell_keys)) for j in range(len(MEASURES))
+        ]) if len(frame) else np.zeros((0, len(MEASURES)))
+        self.sketches = {name: CellSketches(cell_of_row, sketch_seconds(frame, column))
+                         for name, column in SKETCHES.items()}
+
+    def __len__(self):
+        return len(self.measures)
+
+    def copy(self):
+        """Independent copy, e.g. to patch the next snapshot's cube from this one."""
+        other = Cube.__new__(Cube)
+        other.dimensions = list(self.dimensions)
+        other.members = dict(self.members)  # arrays are replaced on change, never modified
+        other.codes = dict(self.codes)
+        other.measures = self.measures.copy()
+        other.sketches = {name: sketch.copy() for name, sketch in self.sketches.items()}
+        return other
+
+    def apply_delta(self, delta):
+        """Update the running sums in place with a srr_changes.RowDelta.
+
+        The old versions of removed and changed rows are subtracted from their
+        cells (sums and sketches) and the new versions of added and changed
+        rows are added; cells
+        and members that did not exist yet are created. Cells left empty stay
+        in place and are ignored by rollups.
+        """
+        for rows, sign in ((delta.outgoing, -1.0), (delta.incoming, 1.0)):
+            if len(rows):
+                cells = self._cells_of(rows)  # may grow self.measures
+                np.add.at(self.measures, cells, sign * cube_measures(rows))
+                for name, sketch in self.sketches.items():
+                    sketch.add(cells, sketch_seconds(rows, SKETCHES[name]), sign)
+
+    def _member_codes(self, dimension, values):
+        # Member code of each value (-1 if missing), adding the members not seen yet
+        missing = pd.isna(values)
+        codes = pd.Index(self.members[dimension]).get_indexer(values)
+        unknown = (codes < 0) & ~missing
+        if unknown.any():
+            members = self.members[dimension]
+            merged = np.asarray(sorted(set(members) | set(values[unknown])), dtype=object)  # keep groupby order
+            remap = pd.Index(merged).get_indexer(members)
+            cell_codes = self.codes[dimension]
+            self.codes[dimension] = np.where(cell_codes >= 0, remap[cell_codes], -1)
+            self.members[dimension] = merged
+            codes = pd.Index(merged).get_indexer(values)
+        codes[missing] = -1
+        return codes
+
+    def _cells_of(self, rows):
+        # Cell of every row in ``rows``, creating the missing cells
+        row_codes = [self._member_codes(dimension, np.asarray(rows[dimension], dtype=object))
+                     for dimension in self.dimensions]
+
+        shape = [len(self.members[dimension]) + 1 for dimension in self.dimensions]
+        existing = np.ravel_multi_index([self.codes[dimension] + 1 for dimension in self.dimensions], shape)
+        wanted = np.ravel_multi_index([codes + 1 for codes in row_codes], shape)
+        cells = pd.Index(existing).get_indexer(wanted)
+        missing = cells < 0
+        if missing.any():
+            fresh = np.unique(wanted[missing])
+            for dimension, codes in zip(self.dimensions, np.unravel_index(fresh, shape)):
+                self.codes[dimension] = np.concatenate([self.codes[dimension], codes - 1])
+            self.measures = np.vstack([self.measures, np.zeros((len(fresh), len(MEASURES)))])
+            cells[missing] = len(existing) + np.searchsorted(fresh, wanted[missing])
+        return cells
+
+    def _cell_values(self, cells):
+        return {dimension: np.append(self.members[dimension], None)[self.codes[dimension][cells]]
+                for dimension in self.dimensions}
+
+    def table(self):
+        """Non-empty cells as a frame of dimension values and measures, in a canonical order."""
+        columns = self._cell_values(slice(None))
+        columns.update(self._columns(self.measures))
+        table = pd.DataFrame(columns)
+        return table[table['n'] > 0].set_index(self.dimensions).sort_index()
+
+    def sketch_table(self, name):
+        """Non-empty (cell, bin) counts of a sketch, by dimension values, in a canonical order."""
+        sketch = self.sketches[name]
+        table = pd.DataFrame(self._cell_values(sketch.cells)).assign(bin=sketch.bins, count=sketch.counts)
+        return table[table['count'] != 0].set_index(self.dimensions + ['bin']).sort_index()
+
+    def matches(self, other):
+        """Whether both cubes hold the same non-empty cells, sketches and (up to rounding) measures."""
+        mine, theirs = self.table(), other.table()
+        if not (mine.index.equals(theirs.index) and np.allclose(mine.to_numpy(float), theirs.to_numpy(float))):
+            return False
+        return all(self.sketch_table(name).equals(other.sketch_table(name)) for name in self.sketches)
+
+    def select(self, filters):
+        """Mask of the cells matching ``filters``, a {dimension: value or list of values} dict."""
+        mask = np.ones(len(self), dtype=bool)
+        for dimension, value in filters.items():
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            members = self.members[dimension]
+            wanted = [code for code, member in enumerate(members) if member in values]
+            mask &= np.isin(self.codes[dimension], wanted)
+        return mask
+
+    def present(self, dimension):
+        """Mask of the cells where ``dimension`` is not missing."""
+        return self.codes[dimension] >= 0
+
+    def rollup(self, by=None, mask=None):
+        """Sum the measures of the cells in ``mask`` (all cells by default).
+
+        Without ``by`` the result is a {measure: total} dict; with it, a frame
+        with one row per ``by`` value present in the selection, in groupby
+        order (missing values dropped), followed by the MEASURES columns.
+        """
+        return self.rollups({by: by}, mask)[by]
+
+    def rollups(self, groups, mask=None):
+        """Several rollups of the cells in ``mask`` in a single aggregation pass.
+
+        ``groups`` maps names to what ``rollup`` takes as ``by`` (a dimension,
+        or None for the totals), optionally as a ``(by, required)`` pair to
+        only count the cells where dimension ``required`` is present. The
+        selected cells are gathered once and every group is summed by the
+        same bincount, each at its own offset; returns {name: rollup}.
+        """
+        measures = self.measures if mask is None else self.measures[mask]
+        keys, cells, blocks = [], [], {}
+        offset = 0
+        for name, spec in groups.items():
+            by, required = spec if isinstance(spec, tuple) else (spec, None)
+            if by is None:
+                codes, size = np.zeros(len(measures), dtype=np.int64), 1
+            else:
+                codes = self.codes[by] if mask is None else self.codes[by][mask]
+                size = len(self.members[by])
+            keep = codes >= 0
+            if required is not None:
+                keep &= (self.codes[required] if mask is None else self.codes[required][mask]) >= 0
+            selected = np.flatnonzero(keep)
+            keys.append(codes[selected] + offset)
+            cells.append(selected)
+            blocks[name] = (by, offset, size)
+            offset += size
+
+        keys, cells = np.concatenate(keys), np.concatenate(cells)
+        sums = np.column_stack([
+            np.bincount(keys, weights=measures[cells, j], minlength=offset) for j in range(len(MEASURES))
+        ])
+        result = {}
+        for name, (by, start, size) in blocks.items():
+            block = sums[start:start + size]
+            if by is None:
+                result[name] = self._columns(block, lambda column: column[0])
+                continue
+            observed = np.flatnonzero(block[:, 0] > 0)
+            columns = {by: self.members[by][observed]}
+            columns.update(self._columns(block[observed]))
+            result[name] = pd.DataFrame(columns)
+        return result
+
+    def quantiles(self, name, by=None, mask=None, quantiles=QUANTILES):
+        """Percentiles (in seconds) of the ``name`` duration over the cells in ``mask``.
+
+        Without ``by`` the result is a {label: value} dict of QUANTILES; with
+        it, a frame indexed by the members of ``by`` with one column per
+        label. Blank durations are left out; NaN where there are none.
+        """
+        sketch = self.sketches[name]
+        if by is None:
+            return histogram_quantiles(sketch.histogram(mask), quantiles)
+        members = self.members[by]
+        histograms = sketch.grouped(self.codes[by], len(members), mask)
+        return pd.DataFrame(histogram_quantiles(histograms, quantiles), index=pd.Index(members, name=by))
+
+    @staticmethod
+    def _columns(sums, convert=lambda column: column):
+        # Counts as integers, sums as floats
+        return {measure: convert(sums[:, j].astype(np.int64) if measure in COUNTS else sums[:, j])
+                for j, measure in enumerate(MEASURES)}
+
+
+def snapshot_hashes(snapshot):
+    """Row hashes of the cube columns of a snapshot, computed once."""
+    return snapshot.derive('cube_row_hashes', lambda: row_hashes(snapshot.frame, CUBE_COLUMNS))
+
+
+def snapshot_cube(snapshot, verify=None):
+    """The Cube of a snapshot, built once and shared by every session.
+
+    When an earlier snapshot already has a cube (the one a pinned lane
+    moved on from, else the previous one) and only a few cases of a large
+    sheet changed since, the new cube is that one patched with the row-level
+    delta instead of a rebuild from the full history. With ``verify`` (default
+    VERIFY_DELTAS) the patched cube is checked against a full recompute,
+    which replaces it on mismatch.
+    """
+    verify = VERIFY_DELTAS if verify is None else verify
+
+    def build():
+        earlier = [candidate for candidate in (snapshot.pinned_after, snapshot.previous)
+                   if candidate is not None and candidate.cached('cube') is not None]
+        snapshot.pinned_after = None  # only needed to find the base cube
+        previous = earlier[0] if earlier else None
+        base = previous.cached('cube') if previous is not None else None
+        if base is None or len(snapshot.frame) < MIN_DELTA_ROWS:
+            return Cube(snapshot.frame)
+        delta = diff_frames(previous.frame, snapshot.frame, snapshot_hashes(previous), snapshot_hashes(snapshot))
+        if delta is None or len(delta) > MAX_DELTA_FRACTION * max(len(snapshot.frame), 1):
+            return Cube(snapshot.frame)
+        cube = base.copy()
+        cube.apply_delta(delta)
+        if verify:
+            full = Cube(snapshot.frame)
+            if not cube.matches(full):
+                logger.error('Incremental cube for version %s differs from a full recompute', snapshot.version)
+                return full
+        return cube
+
+    return snapshot.derive('cube', build)
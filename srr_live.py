@@ -0,0 +1,118 @@
+import logging
+import time
+
+import streamlit as st
+from streamlit import runtime
+from streamlit.proto.ClientState_pb2 import ClientState
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from streamlit.runtime.scriptrunner_utils.script_run_context import ThreadState
+
+from srr_changes import snapshot_changes
+from srr_source import POLL_INTERVAL, describe_freshness, get_analytics_snapshot, get_snapshot, get_source
+
+logger = logging.getLogger(__name__)
+
+REFRESH_INTERVAL = POLL_INTERVAL  # seconds between two runs of the live panels fragment
+
+_warnings = []  # logged once per process
+
+
+def has_newer_snapshot(url, version):
+    """Whether the shared source of ``url`` has published a snapshot other than ``version``."""
+    snapshot = get_source(url).snapshot
+    return snapshot is not None and snapshot.version != version
+
+
+def _current_fragment_id():
+    # Id of the fragment running on this thread, None outside of one
+    try:
+        return ThreadState.get().fragment_id
+    except (AttributeError, RuntimeError):
+        return None
+
+
+def _rerun_fragment(session_id, fragment_id):
+    # Same request the browser sends when a fragment's run_every timer fires
+    info = runtime.get_instance()._session_mgr.get_active_session_info(session_id)
+    if info is not None:
+        client_state = ClientState()
+        client_state.CopyFrom(info.session._client_state)  # the session's page and widget values
+        client_state.fragment_id = fragment_id
+        info.session.request_rerun(client_state)
+
+
+def _can_rerun(session_id):
+    # Whether every step of _rerun_fragment exists in this Streamlit version
+    try:
+        info = runtime.get_instance()._session_mgr.get_active_session_info(session_id)
+        return (info is not None and callable(info.session.request_rerun)
+                and isinstance(info.session._client_state, ClientState))
+    except AttributeError:
+        return False
+
+
+def subscribe_fragment(url, version):
+    """Have the fragment running now rerun as soon as ``url`` publishes a snapshot newer than ``version``.
+
+    Returns False when the session cannot be reached from the poller thread
+    (no Streamlit server, as in bare mode and AppTest, or server internals
+    that moved); the fragment then only reruns on its timer.
+    """
+    ctx = get_script_run_ctx()
+    fragment_id = _current_fragment_id()
+    if ctx is None or fragment_id is None or not runtime.exists():
+        return False
+    session_id = ctx.session_id
+    if not _can_rerun(session_id):
+        if not _warnings:
+            _warnings.append(session_id)
+            logger.warning('Cannot push new snapshots to sessions, live panels refresh every %ss', REFRESH_INTERVAL)
+        return False
+    get_source(url).subscribe(session_id, lambda snapshot: _rerun_fragment(session_id, fragment_id))
+    return True
+
+
+@st.fragment(run_every=REFRESH_INTERVAL)
+def _live_panels(url, analytics_version, render):
+    snapshot = get_snapshot(url)
+    if get_analytics_snapshot(url).version != analytics_version:
+        st.rerun()  # the pinned analytics moved on: the whole page reruns
+    if subscribe_fragment(url, snapshot.version) and has_newer_snapshot(url, snapshot.version):
+        st.rerun(scope='fragment')  # published while this run was rendering
+    st.caption(describe_freshness(get_source(url)))
+    render(snapshot)
+
+
+def live_panels(url, analytics, render):
+    """Freshness caption and ``render(snapshot)`` on the latest snapshot of ``url``, in a fragment of their own.
+
+    Only the live panels depend on the latest snapshot, so only they rerun
+    when it changes: the fragment reruns every REFRESH_INTERVAL seconds,
+    and at once when a new snapshot is pushed to it. Its runs re-read the
+    snapshot, which also keeps the shared poller going. The whole page
+    reruns only when the pinned ``analytics`` snapshot moves on. ``render``
+    is called with the widgets of the page's last full run (sidebar
+    selection included), so it should only depend on those and on the
+    snapshot it is given.
+    """
+    _live_panels(url, analytics.version, render)
+
+
+def show_changes(snapshot, key):
+    """Compact 'what changed' panel of ``snapshot``: a line of counts, and the changed cases on demand.
+
+    The ChangeSet against the previous snapshot is computed once for every
+    session; the table is only sent to the browser while the expander is open.
+    """
+    changes = snapshot_changes(snapshot)
+    if changes is None:
+        return
+    at = time.strftime('%H:%M:%S', time.localtime(changes.fetched_at))
+    if not len(changes):
+        st.caption(f'No case changed at {at}')
+        return
+    st.caption(f"Changes at {at}: {' · '.join(changes.summary())}")
+    expander = st.expander('Show Changes', expanded=False, key=key, on_change='rerun')
+    with expander:
+        if expander.open:
+            st.dataframe(changes.frame, use_container_width=True, hide_index=True)
@@ -0,0 +1,235 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+# 'HH:MM:SS' with optional sign/whitespace around each part, mirroring what int() accepts
+_HMS_PATTERN = r'^\s*([+-]?\d+)\s*:\s*([+-]?\d+)\s*:\s*([+-]?\d+)\s*$'
+
+DURATION_COLUMNS = ['TimeTo: On It', 'TimeTo: Attended']
+
+TIMESTAMP_COLUMNS = ['Date Created', 'Creation Timestamp']
+# Formats tried, in order, when a column's format is not known yet; the first
+# one is what the published sheet uses
+TIMESTAMP_FORMATS = ['%m/%d/%Y %H:%M:%S', '%m/%d/%Y', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d', '%m/%d/%Y %H:%M']
+_timestamp_formats = {}  # column -> format detected on an earlier load
+# Zero-padded layouts of the sheet's own formats, which are parsed with plain
+# digit arithmetic instead of strptime
+_FIXED_WIDTH_FORMATS = {'%m/%d/%Y %H:%M:%S': 'MM/DD/YYYY HH:MM:SS', '%m/%d/%Y': 'MM/DD/YYYY'}
+
+# Columns the dashboards read, with their storage type. Low-cardinality text is
+# held as categoricals, 'Yes'/'No' flags become nullable booleans after parsing
+# and every other column of the sheet is skipped at read time.
+SHEET_SCHEMA = {
+    'Case #': None,
+    'Service': 'category',
+    'Requestor': 'category',
+    'Creation Timestamp': None,
+    'In process (On It SME)': 'category',
+    'Message Link': None,
+    'Status': 'category',
+    'Case Reason': 'category',
+    'Month': 'category',
+    'Weekend?': 'category',
+    'Date Created': None,
+    'Working Hours?': 'category',
+    'TimeTo: On It': None,
+    'TimeTo: Attended': None,
+    'Survey': 'float32',
+}
+
+FLAG_COLUMNS = ['Weekend?', 'Working Hours?']
+_FLAG_VALUES = {'Yes': True, 'No': False}
+
+# '00'..'99', so the common case of formatting needs no per-value string work
+_PADDED = np.array([f'{i:02d}' for i in range(100)], dtype=object)
+
+
+def convert_to_seconds(time_str):
+    """Row-level reference parser; use convert_series_to_seconds on whole columns."""
+    if pd.isnull(time_str):
+        return 0
+    try:
+        h, m, s = map(int, time_str.split(':'))
+        return h * 3600 + m * 60 + s
+    except ValueError:
+        return 0
+
+
+def parse_durations(values):
+    """Parse 'HH:MM:SS' strings into float seconds, NaN where blank or malformed.
+
+    Each distinct string is parsed once and broadcast back with the factorized
+    codes, so the cost follows the number of distinct durations, not rows.
+    """
+    index = values.index if isinstance(values, pd.Series) else None
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+    parts = pd.Series(uniques, dtype=object).astype(str).str.extract(_HMS_PATTERN).to_numpy(dtype=float)
+    parsed = parts @ np.array([3600.0, 60.0, 1.0])
+    # Append a NaN slot so that the -1 code (missing value) lands on it
+    seconds = np.append(parsed, np.nan)[codes]
+    return pd.Series(seconds, index=index) if index is not None else seconds
+
+
+def convert_series_to_seconds(values):
+    """Vectorized convert_to_seconds: int seconds, 0 for blank or malformed cells."""
+    seconds = parse_durations(values)
+    if isinstance(seconds, pd.Series):
+        return seconds.fillna(0).astype(np.int64)
+    return np.nan_to_num(seconds, nan=0).astype(np.int64)
+
+
+def format_hms(seconds, na_rep='N/A'):
+    """Format seconds as 'HH:MM:SS' for a whole Series or array at once.
+
+    Fractional seconds are floored and hours may exceed 99, exactly like
+    seconds_to_hms; NaN (or infinite) values become ``na_rep``.
+    """
+    index = seconds.index if isinstance(seconds, pd.Series) else None
+    values = np.asarray(seconds, dtype=float).ravel()
+    valid = np.isfinite(values)
+    total = np.floor(values[valid]).astype(np.int64)
+    hours, minutes, secs = total // 3600, total % 3600 // 60, total % 60
+
+    hour_text = np.empty(len(hours), dtype=object)
+    small = (hours >= 0) & (hours < 100)
+    hour_text[small] = _PADDED[hours[small]]
+    hour_text[~small] = [f'{h:02d}' for h in hours[~small]]
+
+    text = np.full(len(values), na_rep, dtype=object)
+    text[valid] = hour_text + ':' + _PADDED[minutes] + ':' + _PADDED[secs]
+    return pd.Series(text, index=index) if index is not None else text
+
+
+def seconds_to_hms(seconds):
+    """Scalar form of format_hms, for metric tiles."""
+    return format_hms(np.array([seconds], dtype=float))[0]
+
+
+def detect_timestamp_format(values, sample_size=100):
+    """First of TIMESTAMP_FORMATS that parses a sample of ``values``, or None."""
+    sample = pd.Series(values, dtype=object).dropna().head(sample_size)
+    if sample.empty:
+        return None
+    for fmt in TIMESTAMP_FORMATS:
+        if pd.to_datetime(sample, format=fmt, errors='coerce').notna().all():
+            return fmt
+    return None
+
+
+def _parse_fixed_width(strings, layout):
+    """Parse strings shaped exactly like ``layout``; NaT for any other string."""
+    width = len(layout)
+    stamps = np.full(len(strings), np.datetime64('NaT'), dtype='datetime64[ns]')
+    shaped = (strings.str.len() == width).to_numpy()
+    try:
+        packed = np.asarray(strings[shaped].tolist(), dtype=f'S{width}')
+    except UnicodeEncodeError:
+        shaped &= strings.map(str.isascii).to_numpy()
+        packed = np.asarray(strings[shaped].tolist(), dtype=f'S{width}')
+    if not shaped.any():
+        return stamps
+    chars = np.frombuffer(packed.tobytes(), dtype=np.uint8).reshape(-1, width)
+
+    digit_at = np.array([c in 'MDYHS' for c in layout])
+    digits = chars[:, digit_at].astype(np.int64) - ord('0')
+    ok = ((digits >= 0) & (digits <= 9)).all(axis=1)
+    ok &= (chars[:, ~digit_at] == np.frombuffer(layout.encode(), dtype=np.uint8)[~digit_at]).all(axis=1)
+
+    def field(start, length):
+        value = np.zeros(len(chars), dtype=np.int64)
+        for offset in range(start, start + length):
+            value = value * 10 + chars[:, offset].astype(np.int64) - ord('0')
+        return value
+
+    month, day, year = field(0, 2), field(3, 2), field(6, 4)
+    ok &= (month >= 1) & (month <= 12) & (day >= 1) & (year >= 1700) & (year <= 2250)
+    months = (np.clip(year, 1700, 2250) - 1970) * 12 + np.clip(month, 1, 12) - 1
+    dates = months.astype('datetime64[M]').astype('datetime64[D]') + (day - 1)
+    ok &= dates.astype('datetime64[M]') == months.astype('datetime64[M]')  # e.g. 02/30
+    result = dates.astype('datetime64[ns]')
+    if width > 10:
+        hour, minute, second = field(11, 2), field(14, 2), field(17, 2)
+        ok &= (hour < 24) & (minute < 60) & (second < 60)
+        result = result + ((hour * 60 + minute) * 60 + second).astype('timedelta64[s]')
+
+    result[~ok] = np.datetime64('NaT')
+    stamps[shaped] = result
+    return stamps
+
+
+def parse_timestamps(values, column=None):
+    """Parse timestamp strings into datetimes, NaT where blank or unparseable.
+
+    Like parse_durations, each distinct string is parsed once. The format is
+    detected once per ``column`` and reused on later loads. Zero-padded values
+    in the sheet's own format take a strptime-free fast path, and values that
+    match no known format fall back to pandas' inference one string at a time.
+    """
+    index = values.index if isinstance(values, pd.Series) else None
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+    uniques = pd.Series(uniques, dtype=object).astype(str)
+
+    fmt = _timestamp_formats.get(column) if column is not None else None
+    if fmt is None:
+        fmt = detect_timestamp_format(uniques)
+        if fmt is not None and column is not None:
+            _timestamp_formats[column] = fmt
+    parsed = pd.Series(pd.NaT, index=uniques.index, dtype='datetime64[ns]')
+    if fmt in _FIXED_WIDTH_FORMATS:
+        parsed[:] = _parse_fixed_width(uniques, _FIXED_WIDTH_FORMATS[fmt])
+    leftover = parsed.isna()
+    if fmt is not None and leftover.any():
+        parsed[leftover] = pd.to_datetime(uniques[leftover], format=fmt, errors='coerce')
+        leftover = parsed.isna()
+    if leftover.any():
+        parsed[leftover] = [pd.to_datetime(value, errors='coerce') for value in uniques[leftover]]
+
+    stamps = np.append(parsed.to_numpy(dtype='datetime64[ns]'), np.datetime64('NaT'))[codes]
+    return pd.Series(stamps, index=index) if index is not None else stamps
+
+
+def add_duration_columns(df):
+    """Parse the TimeTo: columns once per load.
+
+    Adds an int '<column> Sec' column (0 for blank or malformed cells, as the
+    summary tables expect) and turns the source column into a timedelta (NaT
+    for blank or malformed cells, so overall averages skip them).
+    """
+    for column in DURATION_COLUMNS:
+        seconds = parse_durations(df[column])
+        df[f'{column} Sec'] = seconds.fillna(0).astype(np.int64)
+        df[column] = pd.to_timedelta(seconds, unit='s')
+    return df
+
+
+def prepare_raw_sheet(df):
+    """Minimal clean-up of the SRR sheet, as used by the analytics tool."""
+    for column in TIMESTAMP_COLUMNS:
+        if column in df:
+            df[column] = parse_timestamps(df[column], column)  # set as datetime
+    df.rename(columns={'In process (On It SME)': 'SME (On It)'}, inplace=True)  # Renaming column
+    return df
+
+
+def add_flag_columns(df):
+    """Turn the 'Yes'/'No' columns into nullable booleans (<NA> for anything else)."""
+    for column in FLAG_COLUMNS:
+        if column in df:
+            df[column] = df[column].map(_FLAG_VALUES).astype('boolean')
+    return df
+
+
+def prepare_sheet(df):
+    """Turn the raw SRR sheet into the frame the dashboards work on."""
+    return add_duration_columns(add_flag_columns(prepare_raw_sheet(df)))
+
+
+def read_sheet(content):
+    """Parse the published CSV bytes with SHEET_SCHEMA and prepare them.
+
+    Columns missing from the sheet are simply absent from the frame.
+    """
+    dtype = {column: kind for column, kind in SHEET_SCHEMA.items() if kind is not None}
+    df = pd.read_csv(io.BytesIO(content), usecols=lambda column: column in SHEET_SCHEMA, dtype=dtype)
+    return prepare_sheet(df)
@@ -0,0 +1,99 @@
+import math
+
+import numpy as np
+
+SKETCH_ACCURACY = 0.005  # relative error of every percentile read from a sketch
+QUANTILES = {'p50': 0.5, 'p90': 0.9, 'p99': 0.99}
+
+_GAMMA = (1 + SKETCH_ACCURACY) / (1 - SKETCH_ACCURACY)
+_MAX_SECONDS = 366 * 86400  # longer durations are counted as this long
+# Bin 0 holds durations under a second; bin k > 0 holds (GAMMA**(k-2), GAMMA**(k-1)]
+SKETCH_BINS = math.ceil(math.log(_MAX_SECONDS) / math.log(_GAMMA)) + 2
+_BIN_VALUES = np.concatenate([[0.0], 2 * _GAMMA ** np.arange(SKETCH_BINS - 1) / (_GAMMA + 1)])
+
+
+def sketch_bins(seconds):
+    """Bin of each duration; the bin's value is within SKETCH_ACCURACY of it."""
+    seconds = np.asarray(seconds, dtype=float)
+    bins = np.zeros(len(seconds), dtype=np.int64)
+    positive = seconds >= 1
+    bins[positive] = np.ceil(np.log(np.minimum(seconds[positive], _MAX_SECONDS)) / math.log(_GAMMA)).astype(np.int64) + 1
+    return bins
+
+
+def histogram_quantiles(histograms, quantiles=QUANTILES):
+    """{label: values} percentiles of one histogram, or of each row of a 2-D array of them.
+
+    The percentile of a histogram is the value of the bin holding the
+    ``q * (count - 1)``-th smallest duration (NaN for empty histograms).
+    """
+    histograms = np.asarray(histograms, dtype=float)
+    cumulative = np.atleast_2d(histograms).cumsum(axis=1)
+    total = cumulative[:, -1]
+    result = {}
+    for label, q in quantiles.items():
+        bins = (cumulative <= (q * (total - 1))[:, None]).sum(axis=1)
+        values = np.where(total > 0, _BIN_VALUES[np.minimum(bins, SKETCH_BINS - 1)], np.nan)
+        result[label] = values if histograms.ndim == 2 else values[0]
+    return result
+
+
+class CellSketches:
+    """Mergeable quantile sketches of one duration, one per cube cell.
+
+    A sketch is a histogram over logarithmic bins, so the sketch of any set
+    of cells is the sum of their histograms and its percentiles are off by at
+    most SKETCH_ACCURACY (relative). Only the non-empty (cell, bin) pairs are
+    stored, as sorted ``cell * SKETCH_BINS + bin`` keys with their counts.
+    """
+
+    def __init__(self, cells, seconds):
+        self.keys, self.counts = self._entries(cells, seconds)
+
+    @staticmethod
+    def _entries(cells, seconds):
+        seconds = np.asarray(seconds, dtype=float)
+        known = ~np.isnan(seconds)  # blank durations are not part of the distribution
+        keys = np.asarray(cells, dtype=np.int64)[known] * SKETCH_BINS + sketch_bins(seconds[known])
+        keys, counts = np.unique(keys, return_counts=True)
+        return keys, counts.astype(np.float64)
+
+    def copy(self):
+        other = CellSketches.__new__(CellSketches)
+        other.keys, other.counts = self.keys.copy(), self.counts.copy()
+        return other
+
+    def add(self, cells, seconds, sign=1):
+        """Add (or, with ``sign=-1``, remove) durations to the sketches of ``cells``."""
+        keys, counts = self._entries(cells, seconds)
+        position = np.searchsorted(self.keys, keys)
+        found = position < len(self.keys)
+        found[found] = self.keys[position[found]] == keys[found]
+        self.counts[position[found]] += sign * counts[found]
+        if not found.all():
+            self.keys = np.insert(self.keys, position[~found], keys[~found])
+            self.counts = np.insert(self.counts, position[~found], sign * counts[~found])
+
+    @property
+    def cells(self):
+        return self.keys // SKETCH_BINS
+
+    @property
+    def bins(self):
+        return self.keys % SKETCH_BINS
+
+    def histogram(self, mask=None):
+        """Merged histogram of the cells in ``mask`` (a boolean array over cells; all by default)."""
+        counts = self.counts if mask is None else self.counts * mask[self.cells]
+        return np.bincount(self.bins, weights=counts, minlength=SKETCH_BINS)
+
+    def grouped(self, groups, size, mask=None):
+        """(size, SKETCH_BINS) histograms, merging the cells by their ``groups`` code (-1 = none)."""
+        cells = self.cells
+        group = groups[cells]
+        keep = group >= 0
+        if mask is not None:
+            keep &= mask[cells]
+        histograms = np.bincount(group[keep] * SKETCH_BINS + self.bins[keep], weights=self.counts[keep],
+                                 minlength=size * SKETCH_BINS)
+        return histograms.reshape(size, SKETCH_BINS)
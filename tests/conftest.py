@@ -0,0 +1,57 @@
+import http.server
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+# The srr_* modules live at the repository root (copies of mac_multipage_app's)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+ETAG = '"v1"'
+LAST_MODIFIED = 'Sun, 18 Oct 2026 15:00:00 GMT'
+
+
+class Sheet:
+    """What the stand-in for the published sheet answers, and the headers it was asked with."""
+
+    def __init__(self):
+        self.body = b'Case #,Status\n1,In Queue\n'
+        self.etag = ETAG
+        self.last_modified = LAST_MODIFIED
+        self.fail = False
+        self.requests = []  # request headers, one dict per GET
+
+
+@pytest.fixture
+def sheet():
+    state = Sheet()
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            state.requests.append(dict(self.headers))
+            if state.fail:
+                self.send_response(500)
+                self.end_headers()
+                return
+            if self.headers.get('If-None-Match') == state.etag:
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header('ETag', state.etag)
+            self.send_header('Last-Modified', state.last_modified)
+            self.send_header('Content-Length', str(len(state.body)))
+            self.end_headers()
+            self.wfile.write(state.body)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    state.url = f'http://127.0.0.1:{server.server_port}/sheet.csv'
+    yield state
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,30 @@
+import sys
+from pathlib import Path
+
+# session_state is not copied to the repository root: only the apps have logins
+sys.path.append(str(Path(__file__).resolve().parents[1] / 'mac_multipage_app'))
+from session_state import SessionStore  # noqa: E402
+
+
+def test_idle_sessions_keep_their_login_but_not_their_cache():
+    store = SessionStore(sweep_interval=10, idle_timeout=100, is_closed=lambda session_id: False)
+    wallboard = store.state('wallboard', now=0)
+    wallboard.user_authenticated = True
+    wallboard.cache.put('view', 'last view')
+    store.state('busy', now=50).cache.put('view', 'last view')
+
+    store.state('busy', now=120)  # sweeps: the wallboard did not run for 120 s
+    assert store.state('wallboard', now=121) is wallboard
+    assert wallboard.user_authenticated and len(wallboard.cache) == 0
+    assert store.state('busy', now=122).cache.get('view') == 'last view'
+
+
+def test_least_recently_run_sessions_are_dropped_beyond_the_cap():
+    store = SessionStore(max_sessions=2, is_closed=lambda session_id: False)
+    first = store.state('first', now=0)
+    store.state('second', now=1)
+    store.state('first', now=2)
+    store.state('third', now=3)
+    assert len(store) == 2 and store.released == 1
+    assert store.state('first', now=4) is first
+    assert store.state('second', now=5) is not first and store.released == 2  # new again: 'third' made room
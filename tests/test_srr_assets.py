@@ -0,0 +1,85 @@
+import http.server
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+# srr_assets is not copied to the repository root: its fallback copies live next to the app
+sys.path.append(str(Path(__file__).resolve().parents[1] / 'mac_multipage_app'))
+from srr_assets import AssetStore  # noqa: E402
+
+UPSTREAM = b'{"v": "5.7.4", "nm": "upstream"}'
+FALLBACK = b'{"v": "5.7.4", "nm": "fallback"}'
+
+
+class Upstream:
+    """What the stand-in for the asset host answers, and how often it was asked."""
+
+    def __init__(self):
+        self.fail = False
+        self.requests = 0
+
+
+@pytest.fixture
+def upstream():
+    state = Upstream()
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            state.requests += 1
+            if state.fail:
+                self.send_response(503)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(UPSTREAM)))
+            self.end_headers()
+            self.wfile.write(UPSTREAM)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    state.url = f'http://127.0.0.1:{server.server_port}/globe.json'
+    yield state
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def store(upstream, tmp_path):
+    fallback_dir = tmp_path / 'assets'
+    fallback_dir.mkdir()
+    (fallback_dir / 'globe.json').write_bytes(FALLBACK)
+    return AssetStore({'globe': upstream.url}, cache_dir=tmp_path / 'cache', fallback_dir=fallback_dir,
+                      retry_interval=0)
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, 'timed out'
+        time.sleep(0.01)
+
+
+def test_upstream_asset_is_downloaded_before_the_fallback_is_used(store, upstream):
+    assert store.content('globe') is None  # downloading
+    wait_for(lambda: store.content('globe') is not None)
+    assert store.content('globe') == UPSTREAM
+    assert (store.cache_dir / 'globe.json').read_bytes() == UPSTREAM
+    assert upstream.requests == 1
+
+
+def test_fallback_is_shown_after_a_failed_download_until_one_succeeds(store, upstream):
+    upstream.fail = True
+    store.content('globe')
+    wait_for(lambda: store.content('globe') is not None)
+    assert store.lottie('globe')['nm'] == 'fallback'
+    assert not (store.cache_dir / 'globe.json').exists()
+
+    upstream.fail = False
+    wait_for(lambda: store.content('globe') == UPSTREAM)  # the retry replaces the fallback
+    assert store.lottie('globe')['nm'] == 'upstream'
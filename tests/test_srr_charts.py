@@ -0,0 +1,22 @@
+import pytest
+
+from srr_benchmarks import dashboard_charts, make_sheet
+from srr_charts import CHART_SPEC_BUDGET, spec_size
+from srr_cube import Cube
+from srr_index import FilterIndex
+from srr_parsing import read_sheet
+from srr_pivot import pivot_keys
+from srr_views import DashboardView
+
+
+@pytest.fixture(scope='module', params=[200, 20_000])
+def view(request):
+    df = read_sheet(make_sheet(request.param))
+    cube = Cube(df)
+    return DashboardView(FilterIndex(df), None, df, cube, cube.select({}), pivot_keys(df))
+
+
+def test_dashboard_charts_fit_the_spec_budget(view):
+    sizes = {name: spec_size(chart) for name, chart in dashboard_charts(view).items()}
+    assert len(sizes) == 7
+    assert all(size <= CHART_SPEC_BUDGET for size in sizes.values()), sizes
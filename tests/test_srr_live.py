@@ -0,0 +1,173 @@
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+import requests
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ClientState_pb2 import ClientState
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from tornado.websocket import websocket_connect
+
+from srr_benchmarks import make_sheet
+
+ROOT = Path(__file__).resolve().parents[1]
+SESSIONS = 20
+
+# Reports the server's thread count, then refreshes like the pages did before (legacy) or with live_panels
+PAGE = f"""
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, {str(ROOT)!r})
+import streamlit as st
+
+from srr_live import live_panels
+from srr_source import get_analytics_snapshot
+
+url = os.environ['SRR_TEST_SHEET']
+st.markdown(f'threads {{threading.active_count()}}')
+if os.environ['SRR_TEST_PAGE'] == 'legacy':
+    time.sleep(120)
+    st.rerun()
+else:
+    live_panels(url, get_analytics_snapshot(url), lambda snapshot: st.markdown(f'version {{snapshot.version}}'))
+"""
+
+# Uses, without the fallbacks of srr_live and session_state, the private Streamlit internals they rely on
+INTERNALS_PAGE = """
+import streamlit as st
+from streamlit import runtime
+from streamlit.proto.ClientState_pb2 import ClientState
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from streamlit.runtime.scriptrunner_utils.script_run_context import ThreadState
+
+session_mgr = runtime.get_instance()._session_mgr
+session_id = get_script_run_ctx().session_id
+session = session_mgr.get_active_session_info(session_id).session
+st.markdown('session_info ' + str(session_mgr.get_session_info(session_id) is not None))
+st.markdown('request_rerun ' + str(callable(session.request_rerun)))
+st.markdown('client_state ' + str(isinstance(session._client_state, ClientState)))
+st.markdown('client_state.fragment_id ' + str('fragment_id' in ClientState.DESCRIPTOR.fields_by_name))
+
+
+@st.fragment
+def fragment():
+    st.markdown('fragment_id ' + str(bool(ThreadState.get().fragment_id)))
+
+
+fragment()
+"""
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+@pytest.fixture
+def server(sheet, tmp_path, request):
+    sheet.body = make_sheet(200)
+    (tmp_path / 'page.py').write_text(INTERNALS_PAGE if request.param == 'internals' else PAGE)
+    port = free_port()
+    env = dict(os.environ, SRR_TEST_SHEET=sheet.url, SRR_TEST_PAGE=request.param)
+    process = subprocess.Popen([sys.executable, '-m', 'streamlit', 'run', 'page.py', '--server.port', str(port),
+                                '--server.headless', 'true', '--browser.gatherUsageStats', 'false'],
+                               cwd=tmp_path, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 60
+    while True:
+        try:
+            if requests.get(f'http://127.0.0.1:{port}/_stcore/health', timeout=1).ok:
+                break
+        except requests.ConnectionError:
+            pass
+        assert time.time() < deadline and process.poll() is None, 'the Streamlit server did not start'
+        time.sleep(0.2)
+    yield port
+    process.terminate()
+    process.wait(timeout=30)
+
+
+async def connect(port):
+    """Session connected to the server, running the page."""
+    session = await websocket_connect(f'ws://127.0.0.1:{port}/_stcore/stream', subprotocols=['streamlit'])
+    message = BackMsg()
+    message.rerun_script.CopyFrom(ClientState())
+    await session.write_message(message.SerializeToString(), binary=True)
+    return session
+
+
+async def receive(session):
+    forward = ForwardMsg()
+    forward.ParseFromString(await asyncio.wait_for(session.read_message(), 60))
+    return forward
+
+
+async def open_session(port, wait_until_finished):
+    """Connected session, once it reported the server's thread count (and finished its run, if asked to)."""
+    session = await connect(port)
+    threads = None
+    while threads is None or wait_until_finished:
+        forward = await receive(session)
+        kind = forward.WhichOneof('type')
+        if kind == 'delta' and forward.delta.new_element.markdown.body.startswith('threads '):
+            threads = int(forward.delta.new_element.markdown.body.split()[1])
+        elif kind == 'script_finished':
+            break
+    return session, threads
+
+
+async def run_page(port):
+    """Markdown and exception messages of one run of the page."""
+    session = await connect(port)
+    markdown, exceptions = [], []
+    while True:
+        forward = await receive(session)
+        kind = forward.WhichOneof('type')
+        if kind == 'delta':
+            element = forward.delta.new_element
+            if element.WhichOneof('type') == 'markdown':
+                markdown.append(element.markdown.body)
+            elif element.WhichOneof('type') == 'exception':
+                exceptions.append(element.exception.message)
+        elif kind == 'script_finished':
+            break
+    session.close()
+    return markdown, exceptions
+
+
+async def threads_before_and_after(port, sessions, wait_until_finished):
+    probe, before = await open_session(port, wait_until_finished)
+    opened = await asyncio.gather(*(open_session(port, wait_until_finished) for _ in range(sessions)))
+    late_probe, after = await open_session(port, wait_until_finished)
+    for session, _ in [(probe, before), *opened, (late_probe, after)]:
+        session.close()
+    return before, after
+
+
+@pytest.mark.parametrize('server', ['live'], indirect=True)
+def test_open_live_sessions_hold_no_thread(server):
+    before, after = asyncio.run(threads_before_and_after(server, SESSIONS, wait_until_finished=True))
+    assert after - before <= 3  # the shared poller and server housekeeping, whatever the number of sessions
+
+
+@pytest.mark.parametrize('server', ['legacy'], indirect=True)
+def test_sleeping_legacy_sessions_hold_a_thread_each(server):
+    before, after = asyncio.run(threads_before_and_after(server, SESSIONS, wait_until_finished=False))
+    assert after - before >= SESSIONS
+
+
+@pytest.mark.parametrize('server', ['internals'], indirect=True)
+def test_streamlit_internals_used_to_push_snapshots_still_exist(server):
+    # srr_live and session_state fall back to polling / keeping sessions when these move: fail here instead
+    markdown, exceptions = asyncio.run(run_page(server))
+    assert not exceptions
+    assert sorted(markdown) == sorted(f'{name} True' for name in [
+        'session_info', 'request_rerun', 'client_state', 'client_state.fragment_id', 'fragment_id'])
@@ -0,0 +1,127 @@
+import io
+import time
+
+import pandas as pd
+import pytest
+import requests
+
+import srr_cube
+from srr_benchmarks import make_sheet
+from srr_parsing import read_sheet
+from srr_source import SheetSource
+
+
+def counting_parse(calls):
+    def parse(content):
+        calls.append(content)
+        return pd.read_csv(io.BytesIO(content))
+    return parse
+
+
+def test_304_keeps_the_snapshot_without_parsing(sheet):
+    calls = []
+    source = SheetSource(sheet.url, parse=counting_parse(calls))
+    first = source.fetch()
+    assert first.version == 1 and len(calls) == 1
+    assert 'If-None-Match' not in sheet.requests[0]
+
+    second = source.fetch()
+    assert second is first
+    assert len(calls) == 1  # not parsed again
+    assert sheet.requests[1]['If-None-Match'] == sheet.etag
+    assert sheet.requests[1]['If-Modified-Since'] == sheet.last_modified
+
+
+def test_changed_body_gives_a_new_version(sheet):
+    calls = []
+    source = SheetSource(sheet.url, parse=counting_parse(calls))
+    first = source.fetch()
+    sheet.body, sheet.etag = b'Case #,Status\n1,In Progress\n2,In Queue\n', '"v2"'
+
+    second = source.fetch()
+    assert second is not first
+    assert second.digest != first.digest
+    assert second.version == first.version + 1
+    assert len(second.frame) == 2 and len(calls) == 2
+
+
+def test_failed_fetch_keeps_serving_the_previous_snapshot(sheet):
+    source = SheetSource(sheet.url, parse=counting_parse([]))
+    first = source.fetch()
+    sheet.fail = True
+
+    with pytest.raises(requests.HTTPError):
+        source.fetch()
+    assert source.snapshot is first
+    assert isinstance(source.last_error, requests.HTTPError)
+    assert source.get(max_age=0) is first  # logged, previous snapshot served
+
+    sheet.fail = False
+    assert source.fetch() is first
+    assert source.last_error is None
+
+
+def test_manual_refresh_is_not_rate_limited_by_the_poller(sheet):
+    source = SheetSource(sheet.url, parse=counting_parse([]))
+    source.fetch()  # the poller, a moment ago
+    assert source.refresh(min_interval=30)
+    requests_made = len(sheet.requests)
+    assert not source.refresh(min_interval=30)  # a second click within the interval
+    assert len(sheet.requests) == requests_made
+
+
+def test_pinned_lane_patches_the_cube_of_its_previous_pin(sheet, monkeypatch):
+    monkeypatch.setattr(srr_cube, 'MIN_DELTA_ROWS', 0)
+    patched = []
+    apply_delta = srr_cube.Cube.apply_delta
+    monkeypatch.setattr(srr_cube.Cube, 'apply_delta', lambda cube, delta: (patched.append(len(delta)),
+                                                                           apply_delta(cube, delta))[1])
+    lines = make_sheet(600).splitlines(keepends=True)
+    sheet.body = b''.join(lines[:500])
+    source = SheetSource(sheet.url, parse=read_sheet)
+    source.fetch()
+    first = source.pinned('analytics', max_age=600)
+    srr_cube.snapshot_cube(first)
+    for version, rows in enumerate(range(520, 601, 20), start=2):  # the poller publishes while the lane is pinned
+        sheet.body, sheet.etag = b''.join(lines[:rows]), f'"v{version}"'
+        source.fetch()
+    assert source.pinned('analytics', max_age=600) is first
+
+    latest = source.pinned('analytics', max_age=0)
+    assert latest is source.snapshot and latest.previous.cached('cube') is None
+    cube = srr_cube.snapshot_cube(latest)
+    assert patched == [100]  # patched from the previous pin, not rebuilt
+    assert cube.matches(srr_cube.Cube(latest.frame))
+
+
+def test_publishing_leaves_the_snapshots_being_read_untouched(sheet):
+    sheet.body = make_sheet(100)
+    source = SheetSource(sheet.url, parse=read_sheet)
+    first = source.fetch()
+    sheet.body, sheet.etag = make_sheet(120), '"v2"'
+    second = source.fetch()
+    sheet.body, sheet.etag = make_sheet(140), '"v3"'
+    third = source.fetch()
+    assert second.previous is not None and second.previous.frame is first.frame  # a session may be diffing it
+    assert third.previous.frame is second.frame and third.previous.previous is None  # one level of history
+    second.derive('cube', lambda: 'built once')
+    assert third.previous.cached('cube') == 'built once'  # derived data is shared with the trimmed copy
+
+
+def test_poller_stops_once_nobody_watches(sheet):
+    source = SheetSource(sheet.url, parse=counting_parse([]))
+    source.fetch()
+    for _ in range(5):  # a page asking for the latest snapshot every 0.1 s
+        source.start_polling(interval=0.05, idle_timeout=0.3)
+        time.sleep(0.1)
+    assert source.polling and len(sheet.requests) > 2
+
+    time.sleep(0.6)  # every page closed
+    assert not source.polling
+    requests_made = len(sheet.requests)
+    time.sleep(0.2)
+    assert len(sheet.requests) == requests_made
+
+    source.start_polling(interval=0.05, idle_timeout=0.3)  # a page opened again
+    time.sleep(0.2)
+    assert source.polling and len(sheet.requests) > requests_made